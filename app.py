@@ -21,6 +21,53 @@ TODO:
 
 DONE:
 
+- [2026-10-18]
+    - DBConn checks out a thread-local cursor from process-wide DBPool,
+      DuckDB file is opened once per process instead of per call
+    - CRUD SQL built by app_helper.build_sql() with values bound as parameters,
+      escape_single_quote() no longer needed
+    - added _db_upsert_many() to load a batch of records in one transaction
+    - select results cached in app_helper.QUERY_CACHE, 
+      invalidated per table by write paths
+    - server-side paging: grids query one page at a time, 
+      sort/filter pushed down to DuckDB
+    - child rows of intersection table loaded by one semi-join query
+    - indexes declared in app_config.INDEX_PROPS, created/checked at startup
+    - COLUMN_PROPS compiled once per process into read-only app_helper.COLUMN_DEFS
+    - fast cold start: st_aggrid/duckdb imported on first use, 
+      first run checked against COLD_START_BUDGET_SEC
+    - writes queued to one writer thread per process, committed in groups
+    - app_server.py owns the DuckDB file for several app processes,
+      clients (DB_SERVER_SOCKET) receive results as Arrow IPC
+    - query_df() fetches Arrow and returns string[pyarrow]/category columns,
+      NULLs filled by fill_blanks() only at grid/form boundary
+    - _db_update_by_id() diffs against the row held by grid/form and updates
+      with "where id=? and ts=?", reports conflict if another user saved first
+    - "Profile rerun" sidebar panel: time per phase (SQL, to_df, grid options/render,
+      form fields), exportable as JSON
+    - SQL trace (SQL_TRACE_FILE): fingerprint, ms, rows, session, menu per statement,
+      flushed by background thread; EXPLAIN ANALYZE captured for slow selects
+    - gen_data.py generates synthetic database (10k - 10M rows),
+      bench_db.py times backend paths (_db_* functions) and writes JSON
+    - bench_pages.py reruns main() headless per page, p50/p95 checked against baseline
+    - load_test.py drives N websocket sessions against running server,
+      reports throughput, latency percentiles, errors and server RSS
+    - "Memory usage" sidebar panel: process RSS, session_state sizes, RSS/tracemalloc
+      delta per rerun by session and menu item, sessions over SESSION_MEMORY_BUDGET_MB flagged
+    - QUERY_CACHE frames shared by sessions (shallow, Arrow-backed), incl. NULL-filled
+      grid frames (query_df(fill=True)); entries held by running sessions are not evicted
+    - app_import.py streams CSV/XLSX uploads in chunks (Arrow CSV reader, openpyxl read-only),
+      one id per row generated by DuckDB, appended by INSERT ... SELECT from Arrow, with progress
+    - imported chunks validated column-wise (required, LOV, URL/email, phd_year),
+      rejected rows downloadable as CSV with reasons
+    - app_dedup.py finds duplicate person/work/entity rows (normalized names/URLs, blocking keys,
+      Jaro-Winkler in DuckDB, clusters), "Duplicates" section merges them into survivors
+    - app_merge.py merges another csinfo database (ATTACH, diff by id and user key,
+      newest/mine/theirs wins), "Merge Database" section on Import/Export
+    - export streamed by DuckDB COPY to CSV, gzip CSV or Parquet (zstd) file,
+      downloaded by st.download_button or, if EXPORT_SERVER_PORT is set, served by
+      HTTP thread (app_export.py), preview capped at EXPORT_PREVIEW_ROWS
+
 - [2023-06-04]
     - added Award: Sloan, Best Paper, NSF career (e.g. https://www.cs.cornell.edu/information/awards-by-recipient)
     - select "Relation (All)" > "person-award" menu to view
@@ -87,6 +134,10 @@ SRC_URL = "https://github.com/wgong/csinfo"
 #####################################################
 # Imports
 #####################################################
+# start timer before imports to measure cold start
+import time
+_T_START = time.perf_counter()
+
 # generic import
 from datetime import datetime, date, timedelta
 from pathlib import Path
@@ -105,19 +156,37 @@ import warnings
 warnings.filterwarnings("ignore")
 
 import streamlit as st
-from st_aggrid import (
-        GridOptionsBuilder, 
-        AgGrid, 
-        GridUpdateMode, 
-        DataReturnMode, 
-        JsCode)
+# st_aggrid is imported in _layout_grid() when a page needs a grid
 
 from app_config import *
 from app_helper import (
-        escape_single_quote, 
-        df_to_csv, 
-        list2sql_str, 
+        build_sql, 
+        sql_tables, 
+        query_df, 
+        fill_blanks, 
+        create_indexes, 
+        gen_label, 
+        get_columns, 
+        COLUMN_DEFS, 
+        QUERY_CACHE, 
+        record_cold_start, 
+        start_profile, 
+        stop_profile, 
+        profile_phase, 
+        set_trace_context, 
+        get_trace_context, 
+        trace_sql, 
+        read_rss_bytes, 
+        session_state_sizes, 
+        MEMORY_TRACKER, 
+        run_write, 
+        execute_write, 
+        get_uid, 
         DBConn, )
+from app_import import preview_upload, import_upload, sheet_target
+from app_dedup import BLOCKING_KEYS, find_duplicates, merge_duplicates
+from app_merge import diff_databases, merge_databases
+from app_export import export_table, preview_table, get_export_server
 
 DEBUG_FLAG = True # False
 ##====================================================
@@ -157,7 +226,7 @@ STR_PROJECT_ALL     = "Project (All)"
 STR_TASK_ALL        = "Task (All)"
 STR_AWARD_ALL       = "Award (All)"
 STR_REFRESH_HINT    = "Click 'Refresh' button to clear form"
-STR_DOWNLOAD_CSV    = "Download CSV"
+STR_DOWNLOAD        = "Download"
 STR_IMPORT_EXPORT   = "Data Import/Export"
 STR_IMPORT          = "Data Import"
 STR_EXPORT          = "Data Export"
@@ -181,9 +250,10 @@ _STR_MENU_IMP_EXP           = STR_IMPORT_EXPORT
 # Aggrid options
 _GRID_OPTIONS = {
     "grid_height": 400,
-    "return_mode_value": DataReturnMode.__members__["FILTERED"],
-    "update_mode_value": GridUpdateMode.__members__["MODEL_CHANGED"],
-    "update_mode": GridUpdateMode.SELECTION_CHANGED | GridUpdateMode.VALUE_CHANGED,
+    # st_aggrid enum member names, resolved in _layout_grid()
+    "return_mode_value": "FILTERED",      # DataReturnMode
+    "update_mode_value": "MODEL_CHANGED", # GridUpdateMode
+    "update_mode": ["SELECTION_CHANGED", "VALUE_CHANGED"],  # GridUpdateMode flags
     "fit_columns_on_grid_load": False,   # False to display wide columns
     # "min_column_width": 50, 
     "selection_mode": "single",  #  "multiple",  # 
@@ -192,30 +262,30 @@ _GRID_OPTIONS = {
     "groupSelectsFiltered": True,
     "enable_pagination": True,
     "paginationPageSize": 10,
+    "server_side_paging": True,   # query one page at a time from DuckDB
 }
 
 BLANK_LIST = [""]
+DATE_COLS = ["due_date", "done_date", "alert_date", "alert_time"]
 
 
-# @st.cache
-def get_uid():
-    return os.getlogin()
-
 def _query_ref_tab_key():
     ref_tab = st.session_state.get("ref_tab", "")
     ref_key = st.session_state.get("ref_key", "")
     # uid = get_uid()
+    # identifiers cannot be bound as parameters, accept known ones only
+    if ref_tab not in TABLE_LIST or ref_key not in ["id", "name", "url"]:
+        return BLANK_LIST
     if all((ref_tab, ref_key)):
-        with DBConn() as _conn:
-            sql_stmt = f"""
-                select distinct {ref_key}
-                from {ref_tab} 
-                where {ref_key} is not NULL
-                order by {ref_key};
-            """
-            df = pd.read_sql(sql_stmt, _conn)
-            # print(df)
-            return BLANK_LIST + df[ref_key].to_list()
+        sql_stmt = f"""
+            select distinct {ref_key}
+            from {ref_tab} 
+            where {ref_key} is not NULL
+            order by {ref_key};
+        """
+        df = query_df(sql_stmt)
+        # print(df)
+        return BLANK_LIST + df[ref_key].to_list()
     else:
         return BLANK_LIST
 
@@ -224,14 +294,7 @@ def _query_ref_tab_key():
 # on UI-form when no row is selected,
 # ensure the LOV type has empty string value as a default type
 SELECTBOX_OPTIONS = {
-    "entity_type": ENTITY_TYPES,
-    "work_type": WORK_TYPES,
-    "person_type": PERSON_TYPES,
-    "org_type": ORG_TYPES,
-    "project_type": PROJECT_TYPES,
-    "note_type": NOTE_TYPES,
-    "priority": PRIORITY,
-    "task_status": TASK_STATUS,
+    **LOV_OPTIONS,
     "ref_tab": BLANK_LIST + sorted([t for t in TABLE_LIST if t not in ["g_relation"]]),
     "ref_key": BLANK_LIST + ["id", "name", "url"],
     "ref_val": _query_ref_tab_key,
@@ -247,99 +310,17 @@ def _debug_print(msg, debug=DEBUG_FLAG):
         # st.write(f"[DEBUG] {str(msg)}")
         print(f"[DEBUG] {str(msg)}")
 
-def _download_df(df, filename_csv):
-    """Download input df to CSV
+def _download_export(export):
+    """Download link of exported file (see app_export.py)
     """
-    if df is not None:
-        st.dataframe(df)
-        st.download_button(
-            label=STR_DOWNLOAD_CSV,
-            data=df_to_csv(df, index=False),
-            file_name=filename_csv,
-            mime='text/csv',
-        )
-
-
-
-# @st.cache
-def _gen_label(col):
-    "Convert table column into form label"
-    if col == 'ts_created': return "Created At"
-    if "_" not in col:
-        if col.upper() in ["URL","ID"]:
-            return col.upper()
-        elif col.upper() == "TS":
-            return "Timestamp"
-        return col.capitalize()
-
-    cols = []
-    for c in col.split("_"):
-        c  = c.strip()
-        if not c: continue
-        cols.append(c.capitalize())
-    return " ".join(cols)
-
-# @st.cache
-def _get_columns(table_name, prop_name="is_visible"):
-    cols_bool = []
-    cols_text = {}
-    for k,v in COLUMN_PROPS[table_name].items():
-        if prop_name.startswith("is_") and v.get(prop_name, False):
-            cols_bool.append(k)
-            
-        if not prop_name.startswith("is_"):
-            val = v.get(prop_name, "")
-            if val:
-                cols_text.update({k: val})
-    
-    return cols_bool or cols_text
-    # return [k for k,v in COLUMN_PROPS[table_name].items() if v.get(prop_name, False) ]
-
-# @st.cache
-def _parse_column_props():
-    """parse COLUMN_PROPS map
-    """
-    col_defs = {}
-    for table_name in COLUMN_PROPS.keys():
-        defs = {}
-        cols_widget_type = {}
-        cols_label_text = {}
-        for p in PROPS:
-            res = _get_columns(table_name, prop_name=p)
-            # print(f"{p}: {res}")
-            if p == 'widget_type':
-                cols_widget_type = res
-            elif p == 'label_text':
-                cols_label_text = res
-            defs[p] = res
-            
-        # reset label
-        for col in cols_widget_type.keys():
-            label = cols_label_text.get(col, "")
-            if not label:
-                label = _gen_label(col)
-            cols_label_text.update({col : label})
-        # print(cols_label_text)
-        defs['label_text'] = cols_label_text
-        defs['all_columns'] = list(cols_widget_type.keys())
-
-        # sort form_column alpha-numerically
-        # max number of form columns = 3
-        # add them
-        tmp = {}
-        for i in range(1,4):
-            m = {k:v for k,v in defs['form_column'].items() if v.startswith(f"col{i}-")}
-            tmp[f"col{str(i)}_columns"] = sorted(m, key=m.__getitem__)        
-        defs.update(tmp)
-        col_defs[table_name] = defs
-
-        
-    return col_defs
+    label = f"{STR_DOWNLOAD} {export['file_name']}"
+    if EXPORT_SERVER_PORT is None:
+        with open(export["path"], "rb") as f:
+            st.download_button(label=label, data=f, file_name=export["file_name"], mime=export["mime"])
+        return
+    url = get_export_server().register(export["path"], export["file_name"], export["mime"])
+    st.markdown(f"[{label}]({url})")
 
-#####################################################
-# define constants
-#####################################################
-COLUMN_DEFS = _parse_column_props()
 
 
 # def _load_db():
@@ -381,40 +362,67 @@ def _layout_grid(df,
             page_size=_GRID_OPTIONS["paginationPageSize"],
             grid_height=_GRID_OPTIONS["grid_height"],
             editable_columns=[],
-            clickable_columns=[]):
+            clickable_columns=[],
+            server_side_paging=False):
     """show df in a grid and return selected row
 
+    server_side_paging: df is one page from _crud_query_grid_page(), which pages, sorts 
+        and filters in DuckDB; grid's own pagination, sort and filter are turned off, 
+        they would act on this page only
+
     Note: renamed from _display_grid_df() to be similar to layout_form()
     """
-
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_selection(selection_mode,
-            use_checkbox=True,
-            groupSelectsChildren=_GRID_OPTIONS["groupSelectsChildren"], 
-            groupSelectsFiltered=_GRID_OPTIONS["groupSelectsFiltered"]
+    from st_aggrid import (
+            GridOptionsBuilder, 
+            AgGrid, 
+            GridUpdateMode, 
+            DataReturnMode, 
+            JsCode)
+
+    update_mode = None
+    for m in _GRID_OPTIONS["update_mode"]:
+        update_mode = GridUpdateMode[m] if update_mode is None else update_mode | GridUpdateMode[m]
+
+    with profile_phase("grid_options", rows=len(df)):
+        gb = GridOptionsBuilder.from_dataframe(df)
+        gb.configure_selection(selection_mode,
+                use_checkbox=True,
+                groupSelectsChildren=_GRID_OPTIONS["groupSelectsChildren"], 
+                groupSelectsFiltered=_GRID_OPTIONS["groupSelectsFiltered"]
+            )
+        if server_side_paging:
+            gb.configure_pagination(enabled=False)
+            gb.configure_default_column(sortable=False, filter=False)
+        else:
+            gb.configure_pagination(paginationAutoPageSize=False, 
+                paginationPageSize=page_size)
+        gb.configure_columns(editable_columns, editable=True)
+
+        render_clickable =  JsCode("""
+        function(params) {return `<a href=${params.value} target="_blank">${params.value}</a>`}
+        """)
+        for col_name in clickable_columns:
+            gb.configure_column(col_name, cellRenderer=render_clickable)
+
+        gb.configure_grid_options(domLayout='normal')
+        grid_options = gb.build()
+
+    with profile_phase("grid_render", rows=len(df)):
+        # AgGrid adds a row id column, df may be shared by sessions (QUERY_CACHE)
+        grid_response = AgGrid(
+            df.copy(deep=False), 
+            gridOptions=grid_options,
+            height=grid_height, 
+            # width='100%',
+            data_return_mode=DataReturnMode[_GRID_OPTIONS["return_mode_value"]],
+            # update_mode=GridUpdateMode[_GRID_OPTIONS["update_mode_value"]],
+            update_mode=update_mode,
+            fit_columns_on_grid_load=_GRID_OPTIONS["fit_columns_on_grid_load"],
+            allow_unsafe_jscode=True, #Set it to True to allow jsfunction to be injected
         )
-    gb.configure_pagination(paginationAutoPageSize=False, 
-        paginationPageSize=page_size)
-    gb.configure_columns(editable_columns, editable=True)
-
-    render_clickable =  JsCode("""
-    function(params) {return `<a href=${params.value} target="_blank">${params.value}</a>`}
-    """)
-    for col_name in clickable_columns:
-        gb.configure_column(col_name, cellRenderer=render_clickable)
-
-    gb.configure_grid_options(domLayout='normal')
-    grid_response = AgGrid(
-        df, 
-        gridOptions=gb.build(),
-        height=grid_height, 
-        # width='100%',
-        data_return_mode=_GRID_OPTIONS["return_mode_value"],
-        # update_mode=_GRID_OPTIONS["update_mode_value"],
-        update_mode=_GRID_OPTIONS["update_mode"],
-        fit_columns_on_grid_load=_GRID_OPTIONS["fit_columns_on_grid_load"],
-        allow_unsafe_jscode=True, #Set it to True to allow jsfunction to be injected
-    )
+    MEMORY_TRACKER.track_frame("grid_data", df)
+    # raw component value, st_aggrid >= 1.0 wraps it in AgGridReturn
+    MEMORY_TRACKER.track_frame("grid_response", getattr(grid_response, "grid_response", grid_response))
     return grid_response
 
 def _layout_form_relation(table_name, 
@@ -424,7 +432,6 @@ def _layout_form_relation(table_name,
     COL_DEFS = COLUMN_DEFS[table_name]
     visible_columns = COL_DEFS["is_visible"]
     system_columns = COL_DEFS["is_system_col"]
-    form_columns = COL_DEFS["form_column"]
     col_labels = COL_DEFS["label_text"]
     widget_types = COL_DEFS["widget_type"]
 
@@ -438,16 +445,9 @@ def _layout_form_relation(table_name,
     data = {"table_name": table_name}
         
     # display form and populate data dict
-    col1_columns = []
-    col2_columns = []
-    col3_columns = []
-    for c in visible_columns:
-        if form_columns.get(c, "").startswith("COL_1-"):
-            col1_columns.append(c)
-        elif form_columns.get(c, "").startswith("COL_2-"):
-            col2_columns.append(c)
-        elif form_columns.get(c, "").startswith("COL_3-"):
-            col3_columns.append(c) 
+    col1_columns = COL_DEFS["col1_columns"]
+    col2_columns = COL_DEFS["col2_columns"]
+    col3_columns = COL_DEFS["col3_columns"]
 
     displayed_cols = []
     col1,col2,col3 = st.columns([6,5,4])
@@ -480,7 +480,7 @@ def _layout_form_relation(table_name,
             if data.get("id"):
                 data.update({"ts": str(datetime.now()),
                             "uid": get_uid(), })
-                _db_update_by_id(data)
+                _db_update_by_id(data, old_row=old_row)
             else:
                 data.update({"id": str(uuid4()), 
                             "ts": str(datetime.now()),
@@ -512,7 +512,6 @@ def _layout_form(table_name,
     COL_DEFS = COLUMN_DEFS[table_name]
     visible_columns = COL_DEFS["is_visible"]
     system_columns = COL_DEFS["is_system_col"]
-    form_columns = COL_DEFS["form_column"]
     col_labels = COL_DEFS["label_text"]
     widget_types = COL_DEFS["widget_type"]
 
@@ -530,19 +529,11 @@ def _layout_form(table_name,
         data.update({"entity_type":entity_type})
         
     # display form and populate data dict
-    col1_columns = []
-    col2_columns = []
-    col3_columns = []
-    for c in visible_columns:
-        if form_name_suffix and c in ["ref_tab", "ref_key", "ref_val"]:
-            # skip displaying ref_key, ref_val for parent/child view
-            continue
-        if form_columns.get(c, "").startswith("COL_1-"):
-            col1_columns.append(c)
-        elif form_columns.get(c, "").startswith("COL_2-"):
-            col2_columns.append(c)
-        elif form_columns.get(c, "").startswith("COL_3-"):
-            col3_columns.append(c) 
+    # skip displaying ref_key, ref_val for parent/child view
+    skip_columns = ["ref_tab", "ref_key", "ref_val"] if form_name_suffix else []
+    col1_columns = [c for c in COL_DEFS["col1_columns"] if c not in skip_columns]
+    col2_columns = [c for c in COL_DEFS["col2_columns"] if c not in skip_columns]
+    col3_columns = [c for c in COL_DEFS["col3_columns"] if c not in skip_columns]
 
     displayed_cols = []
     col1,col2,col3 = st.columns([6,5,4])
@@ -575,7 +566,7 @@ def _layout_form(table_name,
             if data.get("id"):
                 data.update({"ts": str(datetime.now()),
                             "uid": get_uid(), })
-                _db_update_by_id(data)
+                _db_update_by_id(data, old_row=old_row)
             else:
                 data.update({"id": str(uuid4()), 
                             "ts": str(datetime.now()),
@@ -607,7 +598,6 @@ def _layout_form_st(table_name,
     COL_DEFS = COLUMN_DEFS[table_name]
     visible_columns = COL_DEFS["is_visible"]
     system_columns = COL_DEFS["is_system_col"]
-    form_columns = COL_DEFS["form_column"]
     col_labels = COL_DEFS["label_text"]
     widget_types = COL_DEFS["widget_type"]
 
@@ -627,19 +617,11 @@ def _layout_form_st(table_name,
         data.update({"id" : id_val})
 
     # display form and populate data dict
-    col1_columns = []
-    col2_columns = []
-    col3_columns = []
-    for c in visible_columns:
-        if form_name_suffix and c in ["ref_tab", "ref_key", "ref_val"]:
-            # skip displaying ref_key, ref_val for parent/child view
-            continue
-        if form_columns.get(c, "").startswith("COL_1-"):
-            col1_columns.append(c)
-        elif form_columns.get(c, "").startswith("COL_2-"):
-            col2_columns.append(c)
-        elif form_columns.get(c, "").startswith("COL_3-"):
-            col3_columns.append(c) 
+    # skip displaying ref_key, ref_val for parent/child view
+    skip_columns = ["ref_tab", "ref_key", "ref_val"] if form_name_suffix else []
+    col1_columns = [c for c in COL_DEFS["col1_columns"] if c not in skip_columns]
+    col2_columns = [c for c in COL_DEFS["col2_columns"] if c not in skip_columns]
+    col3_columns = [c for c in COL_DEFS["col3_columns"] if c not in skip_columns]
 
     with st.form(form_name, clear_on_submit=True):
         col1,col2,col3 = st.columns([6,5,4])
@@ -672,7 +654,7 @@ def _layout_form_st(table_name,
                     if data.get("id"):
                         data.update({"ts": str(datetime.now()),
                                     "uid": get_uid(), })
-                        _db_update_by_id(data)
+                        _db_update_by_id(data, old_row=old_row)
                     else:
                         data.update({"id": str(uuid4()), 
                                     "ts": str(datetime.now()),
@@ -698,7 +680,6 @@ def _layout_form_inter(table_name,
     COL_DEFS = COLUMN_DEFS[table_name]
     visible_columns = COL_DEFS["is_visible"]
     system_columns = COL_DEFS["is_system_col"]
-    form_columns = COL_DEFS["form_column"]
     col_labels = COL_DEFS["label_text"]
     widget_types = COL_DEFS["widget_type"]
 
@@ -718,16 +699,9 @@ def _layout_form_inter(table_name,
             "rel_type":rel_type }
 
     # display form and populate data dict
-    col1_columns = []
-    col2_columns = []
-    col3_columns = []
-    for c in visible_columns:
-        if form_columns.get(c, "").startswith("COL_1-"):
-            col1_columns.append(c)
-        elif form_columns.get(c, "").startswith("COL_2-"):
-            col2_columns.append(c) 
-        elif form_columns.get(c, "").startswith("COL_3-"):
-            col3_columns.append(c) 
+    col1_columns = COL_DEFS["col1_columns"]
+    col2_columns = COL_DEFS["col2_columns"]
+    col3_columns = COL_DEFS["col3_columns"]
 
     displayed_cols = []
     col1,col2,col3 = st.columns([6,5,4])
@@ -760,7 +734,7 @@ def _layout_form_inter(table_name,
             if data.get("id"):
                 data.update({"ts": str(datetime.now()),
                             "uid": get_uid(), })
-                _db_update_by_id(data)
+                _db_update_by_id(data, old_row=old_row)
             else:
                 data.update({"id": str(uuid4()), 
                             "ts": str(datetime.now()),
@@ -780,24 +754,47 @@ def _layout_form_inter(table_name,
 ###################################################################
 # handle DB Backend
 # ======================================
-def _db_execute(sql_statement, debug=DEBUG_FLAG):
-    with DBConn() as _conn:
+@st.experimental_singleton
+def _db_create_indexes():
+    """create/check indexes defined in INDEX_PROPS once per process
+    """
+    report = create_indexes()
+    for r in report:
+        if r["status"] in ["failed", "mismatch"]:
+            print(f"[ERROR] index {r['index_name']} on {r['table_name']}: {r['status']} - {r['err_msg']}")
+    return report
+
+def _db_execute(sql_statement, params=None, debug=DEBUG_FLAG):
+    _db_execute_batch([(sql_statement, params)], debug=debug)
+
+def _db_execute_batch(statements, debug=DEBUG_FLAG):
+    """execute list of (sql_statement, params) in one transaction,
+    queued to the single writer thread (see app_helper.DBWriter)
+    """
+    for sql_statement, params in statements:
         _debug_print(sql_statement, debug=debug)
-        _conn.execute(sql_statement)
-        _conn.commit()           
+        _debug_print(params, debug=debug)
+    try:
+        execute_write(statements)
+    finally:
+        QUERY_CACHE.bump(*[t for sql_statement, _ in statements for t in sql_tables(sql_statement)])
+
+def _bind_val(col, val):
+    """convert form value into bound parameter
+    """
+    if col in DATE_COLS:
+        return val
+    if val is None or val == 'None':
+        return ''
+    return val
 
 def _db_select_by_id(table_name, id_value=""):
     """Select row by primary key: id
     """
     if not id_value: return []
 
-    with DBConn() as _conn:
-        sql_stmt = f"""
-            select *
-            from {table_name} 
-            where id = '{id_value}' ;
-        """
-        return pd.read_sql(sql_stmt, _conn).fillna("").to_dict('records')
+    sql_stmt = build_sql("select", table_name, key_cols=("id",))
+    return query_df(sql_stmt, params=[id_value], fill=True).to_dict('records')
 
 def _db_select_by_name_url(table_name, name="", url=""):
     """Select row by user key: (name, url)
@@ -805,14 +802,46 @@ def _db_select_by_name_url(table_name, name="", url=""):
     if not any((name,url)):
         return []
     
-    with DBConn() as _conn:
-        sql_stmt = f"""
-            select *
-            from {table_name} 
-            where name='{name}' 
-                and url='{url}';
-        """
-        return pd.read_sql(sql_stmt, _conn).fillna("").to_dict('records')
+    sql_stmt = build_sql("select", table_name, key_cols=("name", "url"))
+    return query_df(sql_stmt, params=[name, url], fill=True).to_dict('records')
+
+def _db_select_children_inter(table_name, ref_tab, ref_key, ref_val,
+                    inter_table_name=TABLE_RELATION, rel_type='person-work', fill=False):
+    """Select visible columns of child rows linked to parent (ref_tab, ref_key, ref_val)
+    by intersection table, fill: NULLs filled for display
+
+    semi-join child table to intersection table in one query,
+    child key column is given by ref_key_sub (id, name or url)
+    """
+    visible_columns = get_columns(table_name, prop_name="is_visible")
+    key_cols = [c for c in ["id", "name", "url"] if c in visible_columns]
+    where_clause = [f"{c} in (select ref_val_sub from it where ref_key_sub = '{c}')" for c in key_cols]
+    where_clause_str = " or ".join(where_clause) if where_clause else " 1=2 "
+    selected_cols = _reorder_selected_cols(visible_columns)
+    sql_stmt = f"""
+        with it as (
+            select ref_key_sub, ref_val_sub
+            from {inter_table_name}
+            where rel_type = ?
+                and ref_tab = ?
+                and ref_key = ?
+                and ref_val = ?
+                and ref_tab_sub = ?
+        )
+        select {", ".join(selected_cols)}
+        from {table_name}
+        where {where_clause_str}
+    """
+    return query_df(sql_stmt, params=[rel_type, ref_tab, ref_key, ref_val, table_name], fill=fill)
+
+def _db_select_org_list():
+    """distinct orgs of g_person for org filter
+    """
+    sql_stmt = """select distinct org
+        from g_person
+        order by org;
+    """
+    return query_df(sql_stmt, fill=True)["org"].to_list()
 
 def _validate_name_url(data):
     """ since all entities have (name,url) as required User-key
@@ -837,61 +866,29 @@ def _db_upsert(data, user_key_cols=["name","url"]):
     if not "uid" in data or not data.get("uid", ""):
         data.update({"uid":get_uid()})
 
-    # build SQL
-    visible_columns = _get_columns(table_name, prop_name="is_visible")
+    visible_columns = get_columns(table_name, prop_name="visible_set")
 
     # query by user-key to avoid duplicates
-    uk_where_clause = []
-    for col,val in data.items():
-        if col in user_key_cols:
-            if val != "":
-                uk_where_clause.append(f" {col} = '{escape_single_quote(val)}' ")
-
-    if not uk_where_clause:
+    uk_cols = tuple([col for col in user_key_cols if col in data and data[col] != ""])
+    if not uk_cols:
         return None # skip if user key cols not populated
 
-    with DBConn() as _conn:
-        where_clause = " and ".join(uk_where_clause)
-        sql_stmt = f"""
-            select id
-            from {table_name} 
-            where {where_clause};
-        """
-        rows = pd.read_sql(sql_stmt, _conn).to_dict('records')
+    sql_stmt = build_sql("select", table_name, cols=("id",), key_cols=uk_cols)
+    uk_vals = [_bind_val(col, data[col]) for col in uk_cols]
+    rows = query_df(sql_stmt, params=uk_vals).to_dict('records')
 
     if not len(rows):
-        sql_type = "INSERT" 
-    else: 
-        sql_type = "UPDATE"  
-        old_row = rows[0]
-
-    
-    if sql_type == "INSERT":
-        col_clause = []
-        val_clause = []
-        for col,val in data.items():
-            if col not in visible_columns:
-                continue
-            col_clause.append(col)
-            if col in ["due_date", "done_date", "alert_date", "alert_time"]:
-                col_val = val
-            else:
-                col_val = escape_single_quote(val)
-            val_clause.append(f"'{col_val}'")
-
-        upsert_sql = f"""
-            insert into {table_name} (
-                {", ".join(col_clause)}
-            )
-            values (
-                {", ".join(val_clause)}
-            );
-        """
+        # INSERT
+        cols = tuple(sorted([col for col in data.keys() if col in visible_columns]))
+        upsert_sql = build_sql("insert", table_name, cols=cols)
+        params = [_bind_val(col, data[col]) for col in cols]
 
     else:
-        set_clause = []
+        # UPDATE
+        old_row = rows[0]
+        cols = []
         for col,val in data.items():
-            if col not in visible_columns or col in user_key_cols:
+            if col not in visible_columns or col in user_key_cols or col == "id":
                 continue
 
             # skip if no change
@@ -900,26 +897,111 @@ def _db_upsert(data, user_key_cols=["name","url"]):
                 old_val = ""
             if val == old_val:
                 continue
+            cols.append(col)
 
-            if col in ["due_date", "done_date", "alert_date", "alert_time"]:
-                col_val = val
-            else:
-                col_val = escape_single_quote(val)
+        if not cols:
+            return None
 
-            set_clause.append(f" {col} = '{col_val}'")
+        cols = tuple(sorted(cols))
+        upsert_sql = build_sql("update", table_name, cols=cols, key_cols=("id",))
+        params = [_bind_val(col, data[col]) for col in cols] + [old_row.get("id")]
 
-        if set_clause:
-            id_ = old_row.get("id")
-            upsert_sql = f"""
-                update {table_name} 
-                set 
-                    {", ".join(set_clause)}
-                where id = '{id_}';
-            """
+    _db_execute(upsert_sql, params)
+
+def _db_upsert_many(table_name, data, user_key_cols=["name","url"], debug=DEBUG_FLAG):
+    """Upsert a batch of records (list of dict or DataFrame) by user key
+
+    The batch is registered as a relation and split into inserts/updates 
+    by a single left join on user key, both applied in one transaction.
+    Within the batch, the last record of a duplicated user key wins.
+
+    Returns:
+        (num_inserted, num_updated)
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    if df.empty:
+        return 0, 0
+
+    visible_columns = get_columns(table_name, prop_name="visible_set")
+    for col in user_key_cols:
+        if col not in df.columns:
+            raise Exception(f"[ERROR] Missing user key column '{col}' for {table_name}")
+
+    cols = [col for col in df.columns if col in visible_columns]
+    df = df[cols].fillna("").astype(str)
+    df = df[df[user_key_cols[0]] != ""]
+    df = df.drop_duplicates(subset=user_key_cols, keep="last")
+
+    # populate system columns
+    _ts, _uid = str(datetime.now()), get_uid()
+    if "id" not in df.columns:
+        df["id"] = ""
+    df["id"] = [v or str(uuid4()) for v in df["id"]]
+    df["ts"] = _ts
+    df["uid"] = _uid
+    cols = list(df.columns)
+
+    view_name = f"v_upsert_{table_name}"
+    split_name = f"t_upsert_{table_name}"
+    uk_join = " and ".join([f"coalesce(t.{c}, '') = b.{c}" for c in user_key_cols])
+    set_cols = [c for c in cols if c not in user_key_cols and c != "id"]
+    set_clause = ", ".join([f"{c} = s.{c}" for c in set_cols])
+
+    split_sql = f"""
+        create or replace temp table {split_name} as
+        select b.*, t.id as _old_id
+        from {view_name} b 
+        left join {table_name} t on {uk_join};
+    """
+    update_sql = f"""
+        update {table_name} 
+        set {set_clause}
+        from {split_name} s
+        where s._old_id is not null
+            and {table_name}.id = s._old_id;
+    """
+    insert_sql = f"""
+        insert into {table_name} ({", ".join(cols)})
+        select {", ".join(cols)}
+        from {split_name}
+        where _old_id is null;
+    """
+    def _upsert(_conn):
+        _conn.register(view_name, df)
+        try:
+            _debug_print(split_sql, debug=debug)
+            _conn.execute(split_sql)
+            num_inserted, num_updated = _conn.execute(f"""
+                select count(*) filter (where _old_id is null), 
+                    count(*) filter (where _old_id is not null)
+                from {split_name};
+            """).fetchone()
+            if num_updated:
+                _debug_print(update_sql, debug=debug)
+                _conn.execute(update_sql)
+            if num_inserted:
+                _debug_print(insert_sql, debug=debug)
+                _conn.execute(insert_sql)
+            _conn.execute(f"drop table {split_name};")
+        finally:
+            _conn.unregister(view_name)
+        return num_inserted, num_updated
+
+    try:
+        return run_write(_upsert)
+    finally:
+        QUERY_CACHE.bump(table_name)
 
-    _db_execute(upsert_sql)
+def _db_update_by_id(data, old_row=None, update_changed=True):
+    """update changed columns of one row, 
+    only if nobody else has updated it since old_row was read (ts unchanged)
 
-def _db_update_by_id(data, update_changed=True):
+    Inputs:
+        data (dict): new values, incl. table_name, id
+        old_row (dict): row held by grid/form when user started editing,
+            changed columns are diffed against it;
+            if not given, the row is read from database
+    """
     if not data: 
         return
     
@@ -931,41 +1013,57 @@ def _db_update_by_id(data, update_changed=True):
     if not id_val:
         return
 
-    if not "uid" in data or not data.get("uid", ""):
-        data.update({"uid":get_uid()})
-
-    if update_changed:
+    if old_row is None:
         rows = _db_select_by_id(table_name=table_name, id_value=id_val)
         if len(rows) < 1:
             return
         old_row = rows[0]
 
-    editable_columns = _get_columns(table_name, prop_name="is_editable")
+    editable_columns = get_columns(table_name, prop_name="editable_set")
 
     # build SQL
-    set_clause = []
+    cols = []
     for col,val in data.items():
         if col not in editable_columns: 
             continue
-        if col in ["due_date", "done_date", "alert_date", "alert_time"]:
-            set_clause.append(f"{col} = '{val}'")
-            continue
-
-        if update_changed:
+        if update_changed and col not in DATE_COLS:
             # skip if no change
             old_val = old_row.get(col, "")
-            if val != old_val:
-                set_clause.append(f"{col} = '{escape_single_quote(val)}'")
-        else:
-            set_clause.append(f"{col} = '{escape_single_quote(val)}'")
+            if val == old_val:
+                continue
+        cols.append(col)
 
-    if set_clause:
-        update_sql = f"""
-            update {table_name}
-            set {', '.join(set_clause)}
-            where id = '{id_val}';
-        """
-        _db_execute(update_sql)   
+    if not cols:
+        return
+
+    new_ts = data.get("ts") or str(datetime.now())
+    if new_ts == old_row.get("ts"):
+        new_ts = str(datetime.now())
+    uid = data.get("uid") or get_uid()
+    cols = tuple(sorted(cols))
+    update_sql = build_sql("update", table_name, cols=cols + ("ts", "uid"), 
+                        key_cols=("id",), version_col="ts")
+    params = [_bind_val(col, data[col]) for col in cols] + [new_ts, uid, 
+                id_val, old_row.get("ts") or ""]
+
+    context = get_trace_context()
+    def _update(_conn):
+        t = time.perf_counter()
+        num_rows = _conn.execute(update_sql, params).fetchone()[0]
+        trace_sql(update_sql, params, ms=(time.perf_counter() - t) * 1000, 
+                  rows=num_rows, kind="write", context=context)
+        return num_rows
+    try:
+        num_updated = run_write(_update)
+    finally:
+        QUERY_CACHE.bump(table_name)
+
+    if not num_updated:
+        rows = _db_select_by_id(table_name=table_name, id_value=id_val)
+        if not rows:
+            raise Exception(f"[CONFLICT] {table_name} row {id_val} has been deleted by another user")
+        raise Exception(f"[CONFLICT] {table_name} row {id_val} was changed by {rows[0].get('uid')} "
+                        f"at {rows[0].get('ts')}, refresh and apply your changes again")
 
 
 def _db_delete_by_id(data):
@@ -980,11 +1078,8 @@ def _db_delete_by_id(data):
     if not id_val:
         return None
     
-    delete_sql = f"""
-        delete from {table_name}
-        where id = '{id_val}';
-    """
-    _db_execute(delete_sql)
+    delete_sql = build_sql("delete", table_name, key_cols=("id",))
+    _db_execute(delete_sql, [id_val])
 
 def _db_delete_by_id_inter(data):
     if not data: 
@@ -1006,21 +1101,12 @@ def _db_delete_by_id_inter(data):
     ref_key_sub = "id"
     ref_val_sub = data.get(ref_key_sub, "")
 
-    inter_col_clause = ['rel_type', 'ref_tab', 'ref_key', 'ref_val', 'ref_tab_sub', 'ref_key_sub', 'ref_val_sub']
+    inter_cols = ('rel_type', 'ref_tab', 'ref_key', 'ref_val', 'ref_tab_sub', 'ref_key_sub', 'ref_val_sub')
     inter_vals = [rel_type, ref_tab, ref_key, ref_val, ref_tab_sub, ref_key_sub, ref_val_sub]
-    inter_where_clause = ["1=1"]
-    for n,col in enumerate(inter_col_clause):
-        val = inter_vals[n]
-        inter_where_clause.append(f" {col} = '{escape_single_quote(val)}' ")
 
     # remove row from intersection table only
-    where_clause_str = " and ".join(inter_where_clause)
-    delete_sql = f"""
-        delete from {inter_table_name}
-        where {where_clause_str}
-        ;
-    """
-    _db_execute(delete_sql)
+    delete_sql = build_sql("delete", inter_table_name, key_cols=inter_cols)
+    _db_execute(delete_sql, [_bind_val(col, val) for col, val in zip(inter_cols, inter_vals)])
 
 def _db_insert_inter(data):
     """populate both child and intersection tables
@@ -1056,40 +1142,21 @@ def _db_insert_inter(data):
     _ts = data.get("ts", str(datetime.now()))
     _uid = get_uid()
 
-    inter_col_clause = ['id', 'ts', 'uid', 'rel_type', 'ref_tab', 'ref_key', 'ref_val', 'ref_tab_sub', 'ref_key_sub', 'ref_val_sub']
+    inter_cols = ('id', 'ts', 'uid', 'rel_type', 'ref_tab', 'ref_key', 'ref_val', 'ref_tab_sub', 'ref_key_sub', 'ref_val_sub')
     inter_vals = [_id, _ts, _uid, rel_type, ref_tab, ref_key, ref_val, ref_tab_sub, ref_key_sub, ref_val_sub]
-    inter_val_clause = []
-    for val in inter_vals:
-        inter_val_clause.append(f"'{escape_single_quote(val)}'")
 
     # build SQL
-    visible_columns = _get_columns(table_name, prop_name="is_visible")
-    col_clause = []
-    val_clause = []
-    for col,val in data.items():
-        if col not in set(visible_columns + SYS_COLS):
-            continue
-        col_clause.append(col) 
-        val_clause.append(f"'{escape_single_quote(val)}'")
+    visible_columns = get_columns(table_name, prop_name="visible_set")
+    cols = tuple(sorted([col for col in data.keys() if col in visible_columns.union(SYS_COLS)]))
 
-    insert_sql = f"""
-        -- populate child table
-        insert into {table_name} (
-            {", ".join(col_clause)}
-        )
-        values (
-            {", ".join(val_clause)}
-        );
-
-        -- populate intersection table
-        insert into {inter_table_name} (
-            {", ".join(inter_col_clause)}
-        )
-        values (
-            {", ".join(inter_val_clause)}
-        );
-    """
-    _db_execute(insert_sql)
+    _db_execute_batch([
+        # populate child table
+        (build_sql("insert", table_name, cols=cols), 
+            [_bind_val(col, data[col]) for col in cols]),
+        # populate intersection table
+        (build_sql("insert", inter_table_name, cols=inter_cols), 
+            [_bind_val(col, val) for col, val in zip(inter_cols, inter_vals)]),
+    ])
 
 
 def _db_quick_add(data):
@@ -1098,8 +1165,7 @@ def _db_quick_add(data):
     # data_cols = DATA_COLS[table_name]
 
     COL_DEFS = COLUMN_DEFS[table_name]
-    editable_columns = COL_DEFS["is_editable"]
-    data_cols = list(set(editable_columns).union(set(SYS_COLS)))
+    data_cols = sorted(COL_DEFS["editable_set"].union(SYS_COLS))
     name = data.get("name")
     url = data.get("url")
     rows = _db_select_by_name_url(table_name, name, url)
@@ -1108,21 +1174,9 @@ def _db_quick_add(data):
         data.update({"id": str(uuid4()),
                      "ts": str(datetime.now()),
                      "uid": get_uid(), })        
-        col_names = []
-        col_vals = []
-        for c in data_cols:
-            v = data.get(c, "")
-            if not v: continue
-            col_names.append(c)
-            col_vals.append(f"'{v}'")        
-
-        sql_stmt = f"""
-            insert into {table_name} 
-            ( {", ".join(col_names)} )
-            values 
-            (  {", ".join(col_vals)} );
-        """
-        _db_execute(sql_stmt)
+        cols = tuple([c for c in data_cols if data.get(c, "")])
+        sql_stmt = build_sql("insert", table_name, cols=cols)
+        _db_execute(sql_stmt, [data[c] for c in cols])
 
 
 def _push_selected_cols_to_end(cols, selected_cols=["entity_type", "ref_tab", "ref_key", "ref_val"] + SYS_COLS):
@@ -1161,6 +1215,68 @@ def _push_selected_cols_to_front(cols, selected_cols=["name","url","note"]):
 def _reorder_selected_cols(cols):
     return _push_selected_cols_to_front(_push_selected_cols_to_end(cols))
 
+def _crud_query_grid_page(form_name, 
+                table_name, 
+                selected_cols, 
+                where_clause, 
+                params, 
+                orderby_clause, 
+                page_size=_GRID_OPTIONS["paginationPageSize"]):
+    """Query one page of rows for server-side paged grid
+
+    Paging, sorting and filtering widgets are displayed above the grid, 
+    their values are pushed down to DuckDB as LIMIT/OFFSET, ORDER BY and WHERE clauses,
+    so that only one page of rows is fetched and sent to browser.
+
+    Inputs:
+        where_clause: " where ..." with '?' placeholders bound to params
+        orderby_clause: default sort, e.g. "name" or "ts desc"
+    """
+    c_fcol, c_fval, c_sort, c_desc, c_page, c_info = st.columns([3,4,3,2,2,3])
+    with c_fcol:
+        filter_col = st.selectbox("Filter column", BLANK_LIST + selected_cols, key=f"{form_name}_filter_col")
+    with c_fval:
+        filter_val = st.text_input("contains", value="", key=f"{form_name}_filter_val")
+    with c_sort:
+        sort_col = st.selectbox("Sort by", BLANK_LIST + selected_cols, key=f"{form_name}_sort_col")
+    with c_desc:
+        sort_desc = st.checkbox("Descending", value=False, key=f"{form_name}_sort_desc")
+
+    where_clause = where_clause or " where 1=1 "
+    params = list(params)
+    if filter_col in selected_cols and filter_val:
+        where_clause += f" and cast({filter_col} as varchar) ilike ? "
+        params.append(f"%{filter_val}%")
+    if sort_col in selected_cols:
+        orderby_clause = f"{sort_col} {'desc' if sort_desc else 'asc'}"
+
+    sql_stmt = f"""
+        select count(*) as num_rows
+        from {table_name}
+            {where_clause};
+    """
+    num_rows = int(query_df(sql_stmt, params=params)["num_rows"][0])
+    num_pages = max(1, (num_rows + page_size - 1) // page_size)
+
+    key_page = f"{form_name}_page_no"
+    if st.session_state.get(key_page, 1) > num_pages:
+        st.session_state[key_page] = num_pages
+    with c_page:
+        # value comes from session state (key_page), passing value= too triggers a warning
+        page_no = st.number_input("Page", min_value=1, max_value=num_pages, step=1, key=key_page)
+    with c_info:
+        st.write(f"{num_rows} rows in {num_pages} pages")
+
+    sql_stmt = f"""
+        select 
+            {",".join(selected_cols)}
+        from {table_name} 
+            {where_clause}
+            {"order by " + orderby_clause if orderby_clause else ""}
+            limit ? offset ?;
+    """
+    return query_df(sql_stmt, params=params + [page_size, (int(page_no) - 1) * page_size], fill=True)
+
 # _STR_MENU_FACULTY
 def _crud_display_grid_parent_child(table_name,
                 person_type="faculty",
@@ -1183,36 +1299,43 @@ def _crud_display_grid_parent_child(table_name,
     # make sure orderby_cols exists
     orderby_cols = list(set(orderby_cols).intersection(set(visible_columns)))
 
-    with DBConn() as _conn:
-        orderby_clause = f' order by {",".join(orderby_cols)}' if orderby_cols else ""
-        where_clause = f" where person_type = '{person_type}' "
-        # add org_filter
-        selected_org = st.session_state.get("selected_org", STR_ALL_ORGS)
-        if selected_org is None or selected_org == "" :
-            where_clause += f"""
-                and ( org = '' or org is NULL )
-            """
-        elif selected_org != STR_ALL_ORGS:
-            where_clause += f"""
-                and org = '{selected_org}'
-            """
+    orderby_clause = ",".join(orderby_cols)
+    where_clause = " where person_type = ? "
+    params = [person_type]
+    # add org_filter
+    selected_org = st.session_state.get("selected_org", STR_ALL_ORGS)
+    if selected_org is None or selected_org == "" :
+        where_clause += f"""
+            and ( org = '' or org is NULL )
+        """
+    elif selected_org != STR_ALL_ORGS:
+        where_clause += f"""
+            and org = ?
+        """
+        params.append(selected_org)
             
-        selected_cols = _reorder_selected_cols(visible_columns)
+    selected_cols = _reorder_selected_cols(visible_columns)
+    if _GRID_OPTIONS["server_side_paging"]:
+        df = _crud_query_grid_page(form_name, table_name, selected_cols, 
+                    where_clause, params, orderby_clause, 
+                    page_size=_GRID_OPTIONS["paginationPageSize"])
+    else:
         sql_stmt = f"""
             select 
                 {",".join(selected_cols)}
             from {table_name} 
                 {where_clause}
-                {orderby_clause};
+                {"order by " + orderby_clause if orderby_clause else ""};
         """
-        df = pd.read_sql(sql_stmt, _conn).fillna("")
+        df = query_df(sql_stmt, params=params, fill=True)
 
     grid_resp = _layout_grid(df, 
             selection_mode=selection_mode, 
-            page_size=10, 
+            page_size=_GRID_OPTIONS["paginationPageSize"], 
             grid_height=370,
             editable_columns=editable_columns,
-            clickable_columns=clickable_columns)
+            clickable_columns=clickable_columns,
+            server_side_paging=_GRID_OPTIONS["server_side_paging"])
     
     selected_row = {}
     if grid_resp and grid_resp.get('selected_rows'):
@@ -1223,8 +1346,13 @@ def _crud_display_grid_parent_child(table_name,
 
     if st.button("Update", key=f"{form_name}_save"):
         data = selected_row
-        data.update({"table_name": table_name})
-        _db_update_by_id(data=data)
+        data.update({"table_name": table_name, "uid": get_uid()})
+        # row as loaded into grid, before inline edits
+        loaded_rows = df[df["id"] == data.get("id")].to_dict('records') if "id" in df.columns else []
+        try:
+            _db_update_by_id(data=data, old_row=loaded_rows[0] if loaded_rows else None)
+        except Exception as ex:
+            st.error(f"{str(ex)}")
 
     primary_key = selected_row.get("url")
     if not primary_key:
@@ -1289,61 +1417,61 @@ def _crud_display_grid_parent_child(table_name,
 
 def _layout_form_fields(data,form_name,old_row,col,
                         widget_types,col_labels,system_columns):
-    DISABLED = col in system_columns
-    if old_row:
-        old_val = old_row.get(col, "")
-        widget_type = widget_types.get(col, "text_input")
-        if widget_type == "text_area":
-            kwargs = {"height":125}
-            val = st.text_area(col_labels.get(col), value=old_val, disabled=DISABLED, key=f"col_{form_name}_{col}", kwargs=kwargs)
-        elif widget_type == "date_input":
-            old_date_input = old_val.split("T")[0]
-            if old_date_input:
-                val_date = datetime.strptime(old_date_input, "%Y-%m-%d")
-            else:
-                val_date = datetime.now().date()
-            val = st.date_input(col_labels.get(col), value=val_date, disabled=DISABLED, key=f"col_{form_name}_{col}")
-            val = datetime.strftime(val, "%Y-%m-%d")
-        elif widget_type == "time_input":
-            old_time_input = old_val
-            if old_time_input:
-                val_time = datetime.strptime(old_time_input.split(".")[0], "%H:%M:%S").time()
-            else:
-                val_time = datetime.now().time()
-            val = st.time_input(col_labels.get(col), value=val_time, disabled=DISABLED, key=f"col_{form_name}_{col}")
-        elif widget_type == "selectbox":
-            # check if options is avail, otherwise display as text_input
-            if col in SELECTBOX_OPTIONS:
-                try:
-                    if col == "ref_val":
-                        _options = SELECTBOX_OPTIONS[col]()
-                    else:
-                        _options = SELECTBOX_OPTIONS.get(col,[])
-
-                    old_val = old_row.get(col, "")
-                    _idx = _options.index(old_val)
-                    val = st.selectbox(col_labels.get(col), _options, index=_idx, key=f"col_{form_name}_{col}")
-                except ValueError:
-                    # if col != "ref_val":
-                    #     opts = SELECTBOX_OPTIONS.get(col,[])
-                    #     val = opts[0] if opts else "" # workaround for refresh error
-                    # else:
-                    #     val = old_row.get(col, "")
-                    val = old_row.get(col, "")
+    with profile_phase("form_field", col=col):
+        DISABLED = col in system_columns
+        if old_row:
+            old_val = old_row.get(col, "")
+            widget_type = widget_types.get(col, "text_input")
+            if widget_type == "text_area":
+                kwargs = {"height":125}
+                val = st.text_area(col_labels.get(col), value=old_val, disabled=DISABLED, key=f"col_{form_name}_{col}", kwargs=kwargs)
+            elif widget_type == "date_input":
+                old_date_input = old_val.split("T")[0]
+                if old_date_input:
+                    val_date = datetime.strptime(old_date_input, "%Y-%m-%d")
+                else:
+                    val_date = datetime.now().date()
+                val = st.date_input(col_labels.get(col), value=val_date, disabled=DISABLED, key=f"col_{form_name}_{col}")
+                val = datetime.strftime(val, "%Y-%m-%d")
+            elif widget_type == "time_input":
+                old_time_input = old_val
+                if old_time_input:
+                    val_time = datetime.strptime(old_time_input.split(".")[0], "%H:%M:%S").time()
+                else:
+                    val_time = datetime.now().time()
+                val = st.time_input(col_labels.get(col), value=val_time, disabled=DISABLED, key=f"col_{form_name}_{col}")
+            elif widget_type == "selectbox":
+                # check if options is avail, otherwise display as text_input
+                if col in SELECTBOX_OPTIONS:
+                    try:
+                        if col == "ref_val":
+                            _options = SELECTBOX_OPTIONS[col]()
+                        else:
+                            _options = SELECTBOX_OPTIONS.get(col,[])
+
+                        old_val = old_row.get(col, "")
+                        _idx = _options.index(old_val)
+                        val = st.selectbox(col_labels.get(col), _options, index=_idx, key=f"col_{form_name}_{col}")
+                    except ValueError:
+                        # if col != "ref_val":
+                        #     opts = SELECTBOX_OPTIONS.get(col,[])
+                        #     val = opts[0] if opts else "" # workaround for refresh error
+                        # else:
+                        #     val = old_row.get(col, "")
+                        val = old_row.get(col, "")
+                else:
+                    val = st.text_input(col_labels.get(col), value=old_val, disabled=DISABLED, key=f"col_{form_name}_{col}")
+
             else:
                 val = st.text_input(col_labels.get(col), value=old_val, disabled=DISABLED, key=f"col_{form_name}_{col}")
 
-        else:
-            val = st.text_input(col_labels.get(col), value=old_val, disabled=DISABLED, key=f"col_{form_name}_{col}")
-
-        if val != old_val or col in ["ref_tab", "ref_key"]:
-            data.update({col : val})
-
-        if col in ["ref_tab", "ref_key"]:
-            # store ref_tab/ref_key selection in session_state
-            # used by _query_ref_tab_key()
-            st.session_state[col] = val
+            if val != old_val or col in ["ref_tab", "ref_key"]:
+                data.update({col : val})
 
+            if col in ["ref_tab", "ref_key"]:
+                # store ref_tab/ref_key selection in session_state
+                # used by _query_ref_tab_key()
+                st.session_state[col] = val
 
     return data
 
@@ -1382,36 +1510,8 @@ def _crud_display_grid_form_inter(table_name,
     clickable_columns = COL_DEFS["is_clickable"]
 
     # prepare dataframe
-    with DBConn() as _conn:
-        # fetch child table keys first
-        sql_stmt = f"""
-            select 
-                it.ref_key_sub as "key_col", 
-                it.ref_val_sub as "key_val"
-            from {inter_table_name} it 
-            where it.rel_type = '{rel_type}'
-                and it.ref_tab = '{ref_tab}'
-                and it.ref_key = '{ref_key}'
-                and it.ref_val = '{ref_val}'
-                and it.ref_tab_sub = '{table_name}'
-        """
-        # print(f"sql_stmt1 = {sql_stmt}")
-        df_1 = pd.read_sql(sql_stmt, _conn).fillna("")  
-        rows = df_1.groupby("key_col")["key_val"].apply(list).to_dict()
-        where_clause = []
-        for k,v in rows.items():
-            where_clause.append(f" {k} in {list2sql_str(v)}")
-
-        # fetch child table rows
-        selected_cols = _reorder_selected_cols(visible_columns)
-        where_clause_str = " or ".join(where_clause) if where_clause else " 1=2 "
-        sql_stmt = f"""
-            select {", ".join(selected_cols)}
-            from {table_name}
-            where {where_clause_str}
-        """
-        # print(f"sql_stmt = {sql_stmt}")
-        df = pd.read_sql(sql_stmt, _conn)   
+    df = _db_select_children_inter(table_name, ref_tab, ref_key, ref_val,
+                        inter_table_name=inter_table_name, rel_type=rel_type, fill=True)
 
     grid_resp = _layout_grid(df, 
             selection_mode="single", 
@@ -1454,9 +1554,12 @@ def _crud_display_grid_form_relation(
     selected_rel_type = st.session_state.get("selected_rel_type")
 
     # prepare dataframe
-    with DBConn() as _conn:
-        selected_cols = _push_selected_cols_to_front(visible_columns, selected_cols=["ref_val","ref_val_sub","props"])
-        where_clause = f" where rel_type = '{selected_rel_type}' "
+    selected_cols = _push_selected_cols_to_front(visible_columns, selected_cols=["ref_val","ref_val_sub","props"])
+    where_clause = " where rel_type = ? "
+    if _GRID_OPTIONS["server_side_paging"]:
+        df = _crud_query_grid_page(form_name, table_name, selected_cols, 
+                    where_clause, [selected_rel_type], orderby_clause, page_size=page_size)
+    else:
         sql_stmt = f"""
             select 
                 {",".join(selected_cols)}
@@ -1464,7 +1567,7 @@ def _crud_display_grid_form_relation(
                 {where_clause}
                 order by {orderby_clause};
         """
-        df = pd.read_sql(sql_stmt, _conn).fillna("")        
+        df = query_df(sql_stmt, params=[selected_rel_type], fill=True)        
 
     ## show data grid
     grid_resp = _layout_grid(df, 
@@ -1472,7 +1575,8 @@ def _crud_display_grid_form_relation(
             page_size=page_size, 
             grid_height=grid_height,
             editable_columns=editable_columns,
-            clickable_columns=clickable_columns)
+            clickable_columns=clickable_columns,
+            server_side_paging=_GRID_OPTIONS["server_side_paging"])
     selected_row = None
     if grid_resp:
         selected_rows = grid_resp['selected_rows']
@@ -1520,29 +1624,35 @@ def _crud_display_grid_form_subject(table_name,
     # orderby_cols = list(set(orderby_cols).intersection(set(visible_columns)))
 
     # prepare dataframe
-    with DBConn() as _conn:
-        # orderby_clause = f' order by {",".join(orderby_cols)}' if orderby_cols else ""
-
-        where_clause = " where 1=1 "
-        if all((ref_tab,ref_key,ref_val)):
+    # orderby_clause = f' order by {",".join(orderby_cols)}' if orderby_cols else ""
+
+    where_clause = " where 1=1 "
+    params = []
+    if all((ref_tab,ref_key,ref_val)):
+        where_clause += f"""
+            and ref_tab = ?
+            and ref_key = ?
+            and ref_val = ?
+        """
+        params.extend([ref_tab, ref_key, ref_val])
+    if table_name == TABLE_PERSON:
+        # add org_filter
+        selected_org = st.session_state.get("selected_org", STR_ALL_ORGS)
+        if selected_org is None or selected_org == "" :
             where_clause += f"""
-                and ref_tab = '{ref_tab}'
-                and ref_key = '{ref_key}'
-                and ref_val = '{ref_val}'
+                and ( org = '' or org is NULL )
             """
-        if table_name == TABLE_PERSON:
-            # add org_filter
-            selected_org = st.session_state.get("selected_org", STR_ALL_ORGS)
-            if selected_org is None or selected_org == "" :
-                where_clause += f"""
-                    and ( org = '' or org is NULL )
-                """
-            elif selected_org != STR_ALL_ORGS:
-                where_clause += f"""
-                    and org = '{selected_org}'
-                """
-
-        selected_cols = _reorder_selected_cols(visible_columns)
+        elif selected_org != STR_ALL_ORGS:
+            where_clause += f"""
+                and org = ?
+            """
+            params.append(selected_org)
+
+    selected_cols = _reorder_selected_cols(visible_columns)
+    if _GRID_OPTIONS["server_side_paging"]:
+        df = _crud_query_grid_page(form_name, table_name, selected_cols, 
+                    where_clause, params, orderby_clause, page_size=page_size)
+    else:
         sql_stmt = f"""
             select 
                 {",".join(selected_cols)}
@@ -1550,7 +1660,7 @@ def _crud_display_grid_form_subject(table_name,
                 {where_clause}
                 order by {orderby_clause};
         """
-        df = pd.read_sql(sql_stmt, _conn).fillna("")
+        df = query_df(sql_stmt, params=params, fill=True)
 
     ## show data grid
     grid_resp = _layout_grid(df, 
@@ -1558,7 +1668,8 @@ def _crud_display_grid_form_subject(table_name,
             page_size=page_size, 
             grid_height=grid_height,
             editable_columns=editable_columns,
-            clickable_columns=clickable_columns)
+            clickable_columns=clickable_columns,
+            server_side_paging=_GRID_OPTIONS["server_side_paging"])
     selected_row = None
     if grid_resp:
         selected_rows = grid_resp['selected_rows']
@@ -1599,18 +1710,18 @@ def _crud_display_grid_form_entity(table_name,
     editable_columns = COL_DEFS["is_editable"]
     clickable_columns = COL_DEFS["is_clickable"]
 
-    with DBConn() as _conn:
-        orderby_clause = f' order by {",".join(orderby_cols)}' if orderby_cols else ' '
-        where_clause = f" where entity_type = '{entity_type}' " if entity_type else ""
-        selected_cols = _reorder_selected_cols(visible_columns)
-        sql_stmt = f"""
-            select {", ".join(selected_cols)}
-            from {table_name} 
-            {where_clause}
-            {orderby_clause};
-        """
-        # print(sql_stmt)
-        df = pd.read_sql(sql_stmt, _conn).fillna("")
+    orderby_clause = f' order by {",".join(orderby_cols)}' if orderby_cols else ' '
+    where_clause = " where entity_type = ? " if entity_type else ""
+    params = [entity_type] if entity_type else []
+    selected_cols = _reorder_selected_cols(visible_columns)
+    sql_stmt = f"""
+        select {", ".join(selected_cols)}
+        from {table_name} 
+        {where_clause}
+        {orderby_clause};
+    """
+    # print(sql_stmt)
+    df = query_df(sql_stmt, params=params, fill=True)
 
     ## show data grid
     grid_resp = _layout_grid(df, 
@@ -1676,7 +1787,7 @@ def _sidebar_quick_add_form(form_name):
     with st.expander(f"{STR_QUICK_ADD}", expanded=False):
         with st.form(key=form_name):
             for col in DATA_COLS[table_name]:
-                st.text_input(_gen_label(col), value="", key=f"{form_name}_{col}")
+                st.text_input(gen_label(col), value="", key=f"{form_name}_{col}")
             st.form_submit_button(STR_ADD, on_click=_sidebar_quick_add)
 
 def _sidebar_quick_add():
@@ -1702,25 +1813,18 @@ def _sidebar_quick_clear_form():
 
 # add org filter
 def _sidebar_display_org_filter(menu_iterm=_STR_MENU_PERSON):
-    with DBConn() as _conn:
-        sql_stmt = """select distinct org
-            from g_person
-            order by org;
-        """
-        df = pd.read_sql(sql_stmt, _conn)
-        org_list = [STR_ALL_ORGS] + df["org"].to_list()
-        idx_default = org_list.index(STR_ALL_ORGS) if menu_iterm==_STR_MENU_PERSON else org_list.index(STR_CORNELL_UNIV)
-        st.selectbox("Select Org:", org_list, index=idx_default, key="selected_org")
+    org_list = [STR_ALL_ORGS] + _db_select_org_list()
+    idx_default = org_list.index(STR_ALL_ORGS) if menu_iterm==_STR_MENU_PERSON else org_list.index(STR_CORNELL_UNIV)
+    st.selectbox("Select Org:", org_list, index=idx_default, key="selected_org")
 
 def _sidebar_display_rel_type():
-    with DBConn() as _conn:
-        sql_stmt = """select distinct rel_type
-            from g_relation
-            order by rel_type;
-        """
-        df = pd.read_sql(sql_stmt, _conn)
-        rel_type_list = df["rel_type"].to_list()
-        st.selectbox("Select Rel Type:", rel_type_list, index=0, key="selected_rel_type")
+    sql_stmt = """select distinct rel_type
+        from g_relation
+        order by rel_type;
+    """
+    df = query_df(sql_stmt, fill=True)
+    rel_type_list = df["rel_type"].to_list()
+    st.selectbox("Select Rel Type:", rel_type_list, index=0, key="selected_rel_type")
 
 #####################################################
 # Menu Handlers
@@ -1796,27 +1900,123 @@ def do_relation():
     st.subheader(f"{_STR_MENU_RELATION}")
     _crud_display_grid_form_relation()
 
+def _layout_dedup():
+    """find duplicate rows of a table (app_dedup.py) and merge them into survivors
+    """
+    st.subheader("Duplicates")
+    tables = list(BLOCKING_KEYS.keys())
+    c1, c2 = st.columns([2,1])
+    with c1:
+        table_name = st.selectbox("Find duplicates in:", tables, key="dedup_table")
+    with c2:
+        min_score = st.number_input("Min score", min_value=0.5, max_value=1.0, 
+                                    value=float(DEDUP_MIN_SCORE), step=0.01, key="dedup_min_score")
+    if st.button("Find Duplicates ..."):
+        with st.spinner(f"Comparing rows of {table_name} ..."):
+            clusters, stats = find_duplicates(table_name, min_score=min_score)
+        st.session_state["dedup_result"] = (table_name, clusters, stats)
+
+    result = st.session_state.get("dedup_result")
+    if not result or result[0] != table_name:
+        return
+    _, clusters, stats = result
+    st.write(f"{stats['clusters']} clusters ({stats['rows_in_clusters']} rows) "
+             f"in {stats['rows']} rows, {stats['pairs']} pairs compared, {stats['ms']/1000:.1f} sec")
+    if clusters.empty:
+        return
+    st.dataframe(fill_blanks(clusters.head(IMPORT_PREVIEW_ROWS * 50)))
+    if st.button(f"Merge {stats['clusters']} clusters into survivors"):
+        try:
+            n = merge_duplicates(table_name, clusters)
+            st.success(f"{n} duplicate rows of {table_name} merged")
+        except Exception as ex:
+            st.error(f"Merge failed: {ex}")
+        st.session_state.pop("dedup_result", None)
+
+def _merge_db_path(uploaded_file):
+    """save uploaded database to a temp file (once per upload), return its path
+    """
+    saved = st.session_state.get("merge_db_path")
+    if saved and saved[0] == uploaded_file.id and os.path.exists(saved[1]):
+        return saved[1]
+    if saved and os.path.exists(saved[1]):
+        os.remove(saved[1])
+    import shutil
+    import tempfile
+    fd, path = tempfile.mkstemp(suffix=".duckdb", prefix="merge_")
+    with os.fdopen(fd, "wb") as f:
+        uploaded_file.seek(0)
+        shutil.copyfileobj(uploaded_file, f)
+    st.session_state["merge_db_path"] = (uploaded_file.id, path)
+    return path
+
+def _layout_merge_db():
+    """diff another csinfo database (app_merge.py) and merge it into this one
+    """
+    st.subheader("Merge Database")
+    c1, c2 = st.columns([2,1])
+    with c1:
+        uploaded_file = st.file_uploader("Upload csinfo database", type=["duckdb"], key="merge_db_file")
+    with c2:
+        resolution = st.selectbox("Conflicts: winner is", MERGE_RESOLUTIONS, key="merge_resolution")
+    if uploaded_file is None:
+        return
+    other_db = _merge_db_path(uploaded_file)
+    if st.button("Compare ..."):
+        try:
+            with st.spinner(f"Comparing {uploaded_file.name} ..."):
+                report, conflicts = diff_databases(other_db, resolution=resolution)
+            st.session_state["merge_result"] = (uploaded_file.id, resolution, report, conflicts)
+        except Exception as ex:
+            st.error(f"Compare failed: {ex}")
+
+    result = st.session_state.get("merge_result")
+    if not result or result[:2] != (uploaded_file.id, resolution):
+        return
+    _, _, report, conflicts = result
+    st.dataframe(report)
+    if not conflicts.empty:
+        st.write(f"Conflicting rows (pick_theirs: their values win with '{resolution}'):")
+        st.dataframe(fill_blanks(conflicts))
+    if st.button(f"Merge {uploaded_file.name} into my database"):
+        try:
+            with st.spinner(f"Merging {uploaded_file.name} ..."):
+                report, _ = merge_databases(other_db, resolution=resolution)
+            st.success(f"{report['inserted'].sum()} rows inserted, {report['updated'].sum()} rows updated")
+            st.dataframe(report)
+        except Exception as ex:
+            st.error(f"Merge failed: {ex}")
+        st.session_state.pop("merge_result", None)
+
 def do_import_export():
     # Export
     st.subheader(f"{STR_EXPORT}")
     st.write(f"FILE_DB: {FILE_DB}, exists: {Path(FILE_DB).exists()}")
 
-    with DBConn() as _conn:
-        sql_stmt = """select t.table_name
-            from information_schema.tables t where t.table_name like 'g_%';
-        """
-        df1 = pd.read_sql(sql_stmt, _conn)
-        tables = df1["table_name"].to_list()
-        idx_default = tables.index("g_work")
+    sql_stmt = """select t.table_name
+        from information_schema.tables t where t.table_name like 'g_%';
+    """
+    df1 = query_df(sql_stmt, use_cache=False)
+    tables = df1["table_name"].to_list()
+    idx_default = tables.index("g_work")
+    c1, c2 = st.columns([2,1])
+    with c1:
         selected_table = st.selectbox("Select table:", tables, index=idx_default, key="export_table")
+    with c2:
+        export_format = st.selectbox("Format:", list(EXPORT_FORMATS.keys()), key="export_format")
 
-        export_btn = st.button("Export Data ...")
-        if export_btn:
-            sql_stmt = f"""select * from {selected_table};"""
-            df = pd.read_sql(sql_stmt, _conn).fillna("")
-            ts = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-            filename_csv = f"{selected_table}_{ts}.csv"
-            _download_df(df, filename_csv)
+    export_btn = st.button("Export Data ...")
+    if export_btn:
+        try:
+            with st.spinner(f"Exporting {selected_table} ..."):
+                export = export_table(selected_table, fmt=export_format)
+        except Exception as ex:
+            st.error(f"Export failed: {ex}")
+        else:
+            st.write(f"{export['rows']} rows, {export['nbytes'] / 2**20:.1f} MB "
+                     f"in {export['ms'] / 1000:.1f} sec, first {EXPORT_PREVIEW_ROWS} rows:")
+            st.dataframe(fill_blanks(preview_table(selected_table)))
+            _download_export(export)
 
     # Import
     st.subheader(f"{STR_IMPORT}")
@@ -1826,74 +2026,53 @@ def do_import_export():
     """, unsafe_allow_html=True)
 
     c_left,c_right = st.columns([5,1])
-    df_dict = {}
+    previews = {}
     filename = ""
     with c_right:
         uploaded_file = st.file_uploader("Upload file", type=["csv","xlsx"])
         if uploaded_file is not None:
             filename = uploaded_file.name
-            file_ext = filename.split(".")[-1].lower()
-            if file_ext == "csv":
-                df_dict[filename] = pd.read_csv(uploaded_file)
-            elif file_ext == "xlsx":
-                xlsx_obj = pd.ExcelFile(uploaded_file, engine="openpyxl")
-                for sheet in xlsx_obj.sheet_names:
-                    key = sheet.lower().replace(" ", "_")
-                    df_dict[key] = pd.read_excel(xlsx_obj, sheet, keep_default_na=False)
+            previews = preview_upload(uploaded_file, filename)
 
     with c_left:
         if filename: st.write(f"filename: {filename}")
-        for key in df_dict.keys():
-            st.write(f"{key} df:")
-            st.dataframe(df_dict[key])
+        for key, df in previews.items():
+            target = sheet_target(key)
+            st.write(f"{key} (first {len(df)} rows) -> {target['table_name'] if target else 'skipped'}:")
+            st.dataframe(df)
 
     import_btn = st.empty()
     if filename:
         import_btn = st.button("Import Data ...")
-    if import_btn:
-        with DBConn() as _conn:
-            for key in df_dict.keys():
-                view_name = f"v_{key}"
-                st.write(f"view_name = {view_name}")
-                df = df_dict[key]
-                st.write(f"columns = {df.columns}")
-                _conn.register(f"{view_name}", df)
-
-                _id = uuid()
-                _uid = get_uid()
-                _ts = str(datetime.now())
-                if key == "faculty":
-                    sql_stmt = f"""insert into g_person (
-                            id, uid, ts, 
-                            person_type, name, job_title, phd_univ, phd_year, 
-                            research_area, research_concentration, 
-                            research_focus, url, img_url, phone, email, cell_phone, 
-                            office_address, department, org
-                        )
-                        select 
-                            '{_id}', '{_uid}', '{_ts}', 
-                            'faculty', name, job_title, phd_univ, phd_year, 
-                            research_area, research_concentration, 
-                            research_focus, url, img_url, phone, email, cell_phone, 
-                            office_address, department, org
-                        from {view_name}
-                    """
-                    st.write(f"sql_stmt =\n {sql_stmt}")
-                    res = _conn.execute(sql_stmt).df()
-                    st.dataframe(res)
-                elif key == "research_groups":
-                    sql_stmt = f"""insert into g_entity (
-                            id, uid, ts, 
-                            entity_type, name, url
-                        )
-                        select 
-                            '{_id}', '{_uid}', '{_ts}', 
-                            'research_group', research_group, url
-                        from {view_name}
-                    """
-                    st.write(f"sql_stmt =\n {sql_stmt}")
-                    res = _conn.execute(sql_stmt).df()
-                    st.dataframe(res)
+    if filename and import_btn:
+        progress_bar = st.progress(0.0)
+        status = st.empty()
+        file_size = max(1, uploaded_file.size)
+        def _progress(key, table_name, rows):
+            # CSV/XLSX are read sequentially, position in upload is progress
+            progress_bar.progress(min(1.0, uploaded_file.tell() / file_size))
+            status.write(f"{key} -> {table_name}: {rows} rows loaded")
+        try:
+            report, rejects = import_upload(uploaded_file, filename, progress=_progress)
+        except Exception as ex:
+            st.error(f"Import failed: {ex}")
+            return
+        progress_bar.progress(1.0)
+        status.write(f"{sum([r['rows'] for r in report.values()])} rows imported, "
+                     f"{sum([r['rejected'] for r in report.values()])} rows rejected")
+        st.dataframe(pd.DataFrame([dict(sheet=k, **v) for k, v in report.items()]))
+        ts = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        for key, data in rejects.items():
+            st.download_button(f"Download rejects of {key}", data=data, 
+                    file_name=f"rejects_{key}_{ts}.csv", mime="text/csv", key=f"rejects_{key}")
+        # check imported table for duplicates next
+        imported = [r["table_name"] for r in report.values() if r["rows"] and r["table_name"] in BLOCKING_KEYS]
+        if imported:
+            st.session_state["dedup_table"] = imported[0]
+            st.info(f"Imported rows may duplicate existing ones, see Duplicates of {imported[0]} below")
+
+    _layout_dedup()
+    _layout_merge_db()
 
 #####################################################
 # setup menu_items 
@@ -1958,10 +2137,76 @@ def do_body():
     menu_item = st.session_state.get("menu_item", _STR_MENU_HOME)
     menu_dict[menu_item]["fn"]()
 
+def do_profile_panel(prof):
+    """sidebar panel with timings of this rerun, opt-in by checkbox
+    """
+    with st.sidebar:
+        profile_on = st.checkbox("Profile rerun", value=False, key="profile_rerun")
+        if not profile_on or prof is None:
+            return
+        with st.expander(f"Profile: {prof.elapsed_ms():.0f} ms", expanded=True):
+            st.dataframe(prof.summary())
+            df_sql = pd.DataFrame([r for r in prof.records if r["phase"] == "sql"], 
+                                  columns=["ms", "rows", "cached", "sql"])
+            st.dataframe(df_sql)
+            ts = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            st.download_button("Export JSON", data=prof.to_json(), 
+                    file_name=f"profile_{ts}.json", mime="application/json")
+
+def do_memory_panel(session_id, state_sizes, over_budget):
+    """sidebar panel with process RSS, session_state sizes of this session,
+    memory per session and per menu item, opt-in by checkbox
+    """
+    with st.sidebar:
+        if over_budget:
+            st.warning(f"This session holds more than {SESSION_MEMORY_BUDGET_MB} MB")
+        memory_on = st.checkbox("Memory usage", value=False, key="memory_usage")
+        if not memory_on:
+            return
+        mb = lambda n: round((n or 0) / 2**20, 2)
+        with st.expander(f"Process RSS: {mb(read_rss_bytes()):.0f} MB", expanded=True):
+            cache = QUERY_CACHE.stats()
+            st.caption(f"Query cache (shared): {mb(cache['nbytes'])} MB in {cache['entries']} entries, "
+                       f"{cache['held_entries']} held by {cache['holders']} sessions")
+            df_state = pd.DataFrame(state_sizes, columns=["key", "type", "nbytes"])
+            df_state["MB"] = df_state["nbytes"].map(mb)
+            st.caption(f"This session: {df_state['MB'].sum():.2f} MB in session_state")
+            st.dataframe(df_state[["key", "type", "MB"]])
+            df_sess = MEMORY_TRACKER.sessions_df()
+            df_sess["this"] = df_sess["session"] == session_id
+            st.caption("Sessions (bytes)")
+            st.dataframe(df_sess)
+            st.caption("Menu items (bytes)")
+            st.dataframe(MEMORY_TRACKER.menus_df())
+
 def main():
     # _load_db()
-    do_sidebar()
-    do_body()
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    session_id = ctx.session_id if ctx else ""
+    menu_item = st.session_state.get("menu_item", _STR_MENU_HOME)
+    set_trace_context(session=session_id, menu=menu_item)
+    prof = None
+    if st.session_state.get("profile_rerun", False):
+        prof = start_profile(label=menu_item)
+    try:
+        with MEMORY_TRACKER.rerun(session_id, menu_item):
+            with profile_phase("sidebar"):
+                do_sidebar()
+            with profile_phase("body"):
+                do_body()
+        # after first page is painted
+        with profile_phase("metadata"):
+            _db_create_indexes()
+    finally:
+        stop_profile()
+        # frames of this run may be evicted from shared cache now
+        QUERY_CACHE.release(session_id)
+    do_profile_panel(prof)
+    state_sizes = session_state_sizes(st.session_state)
+    do_memory_panel(session_id, state_sizes, 
+                    MEMORY_TRACKER.update_session(session_id, state_sizes))
+    record_cold_start(time.perf_counter() - _T_START)
 
 if __name__ == '__main__':
     main()
@@ -2,6 +2,72 @@
 # FILE_DB = f"./db/cs-faculty-20230502.duckdb"
 FILE_DB = "cs-faculty-20230604.duckdb"
 
+# max total size of query results cached in memory (per process)
+QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# all writes go through one writer thread per process,
+# queued writes are committed in groups of up to WRITE_QUEUE_MAX_BATCH
+DB_WRITE_QUEUE = True
+WRITE_QUEUE_MAX_BATCH = 32
+WRITE_QUEUE_MAX_WAIT_SEC = 0.002
+
+# Unix socket of database server (app_server.py) owning FILE_DB,
+# set it when several app processes share one database file,
+# empty: open FILE_DB in this process
+DB_SERVER_SOCKET = ""
+
+# max seconds for first script run after (re)start, incl. imports
+COLD_START_BUDGET_SEC = 2.0
+
+# SQL trace log: one JSON line per statement (fingerprint, ms, rows, session, menu),
+# buffered and appended by background thread every SQL_TRACE_FLUSH_SEC, empty: off;
+# e.g. "sql_trace.jsonl" while profiling, the file is not rotated
+SQL_TRACE_FILE = ""
+SQL_TRACE_FLUSH_SEC = 1.0
+# select statements slower than SLOW_QUERY_MS get EXPLAIN ANALYZE captured,
+# at most once per fingerprint every SLOW_QUERY_EXPLAIN_INTERVAL_SEC
+SLOW_QUERY_MS = 500
+SLOW_QUERY_EXPLAIN_INTERVAL_SEC = 300
+
+# sessions holding more than SESSION_MEMORY_BUDGET_MB in session_state and grid frames
+# are flagged in "Memory usage" panel and logged
+SESSION_MEMORY_BUDGET_MB = 200
+# trace Python allocations per rerun by tracemalloc (slows down every allocation)
+MEMORY_TRACEMALLOC = False
+
+# uploads are imported in chunks: CSV by bytes read per chunk, XLSX by rows per chunk,
+# each chunk is one write transaction
+IMPORT_CHUNK_BYTES = 8 * 1024 * 1024
+IMPORT_CHUNK_ROWS = 50_000
+IMPORT_PREVIEW_ROWS = 20
+# imported rows failing these checks are rejected (see app_import.validate_chunk)
+IMPORT_URL_COLUMNS = ("url", "img_url")
+IMPORT_EMAIL_COLUMNS = ("email",)
+IMPORT_PHD_YEAR_RANGE = (1900, 2100)
+
+# duplicate detection (app_dedup.py): rows linked if score >= DEDUP_MIN_SCORE,
+# blocks (rows sharing a blocking key) larger than DEDUP_MAX_BLOCK are not compared
+DEDUP_MIN_SCORE = 0.92
+DEDUP_MAX_BLOCK = 200
+
+# merge of another database (app_merge.py): conflicting values are taken from
+# row with newest ts, from my database or from their database
+MERGE_RESOLUTIONS = ["newest", "mine", "theirs"]
+
+# export (app_export.py): format -> (file extension, DuckDB COPY options)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "FORMAT CSV, HEADER"),
+    "CSV (gzip)": ("csv.gz", "FORMAT CSV, HEADER, COMPRESSION GZIP"),
+    "Parquet (zstd)": ("parquet", "FORMAT PARQUET, COMPRESSION ZSTD"),
+}
+EXPORT_PREVIEW_ROWS = 100
+# None: exported files are handed to st.download_button, which reads the whole file into memory;
+# set a port (e.g. 8599, 0: any free port) to serve them by an HTTP thread of the app process
+# instead (links expire after EXPORT_MAX_AGE_SEC), host must be reachable by browser
+EXPORT_SERVER_HOST = "localhost"
+EXPORT_SERVER_PORT = None
+EXPORT_MAX_AGE_SEC = 3600
+
 # generic object
 TABLE_ENTITY = "g_entity"
 TABLE_EXTENT = "g_extent"   
@@ -112,6 +178,18 @@ PRIORITY = [
     '', 'Urgent', 'Important-1', 'Important-2', 'Important-3',
 ]
 
+# list of values of selectbox columns (also checked by import)
+LOV_OPTIONS = {
+    "entity_type": ENTITY_TYPES,
+    "work_type": WORK_TYPES,
+    "person_type": PERSON_TYPES,
+    "org_type": ORG_TYPES,
+    "project_type": PROJECT_TYPES,
+    "note_type": NOTE_TYPES,
+    "priority": PRIORITY,
+    "task_status": TASK_STATUS,
+}
+
 # columns for Quick Add
 COMMON_DATA_COLS = ['name', 'url', 'note', "tags"]
 
@@ -1292,3 +1370,43 @@ COLUMN_PROPS = {
 
 TABLE_LIST = list(COLUMN_PROPS.keys()) + ["g_award","g_research_group"]
 
+## index spec: {table_name: {index_name: props}}
+# created if missing and checked at startup by app_helper.create_indexes()
+# DuckDB looks up rows via single-column indexes only.
+# No unique indexes: DuckDB (0.7) updates an indexed column by delete + insert,
+# which violates a unique index at commit even if the key is unchanged;
+# user keys (name, url) are enforced by lookup before insert
+# (_db_upsert, _db_upsert_many, app_import.load_chunk)
+INDEX_PROPS = {
+    "g_relation": {
+        "idx_g_relation_ref_val": {
+            "columns": ["ref_val"],
+            "is_unique": False,
+        },
+        "idx_g_relation_ref_val_sub": {
+            "columns": ["ref_val_sub"],
+            "is_unique": False,
+        },
+    },
+    "g_person": {
+        "idx_g_person_url": {
+            "columns": ["url"],
+            "is_unique": False,
+        },
+    },
+}
+
+# every table: lookup by id, every entity: lookup by name
+for _table_name in COLUMN_PROPS.keys():
+    _index_props = INDEX_PROPS.setdefault(_table_name, {})
+    _index_props[f"idx_{_table_name}_id"] = {
+        "columns": ["id"],
+        "is_unique": False,
+    }
+    if _table_name == TABLE_RELATION:
+        continue
+    _index_props[f"idx_{_table_name}_name"] = {
+        "columns": ["name"],
+        "is_unique": False,
+    }
+
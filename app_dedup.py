@@ -0,0 +1,302 @@
+"""
+Fuzzy duplicate detection (entity resolution) for g_person, g_work, g_entity
+
+All steps are set-based SQL run by DuckDB on temp tables:
+    1. normalize: name (lower case, no accents/punctuation, "Last, First" -> "first last"),
+       URL (no scheme, www., trailing slash), DOI and arXiv id from URL, email, org
+    2. block: rows sharing a blocking key (BLOCKING_KEYS) are candidate pairs,
+       blocks larger than DEDUP_MAX_BLOCK are skipped, so pairs grow ~ linearly with rows
+    3. score: Jaro-Winkler similarity of normalized names,
+       pairs sharing an identifier (URL, email, DOI, arXiv id) get 0.5 + 0.5 * similarity
+    4. cluster: pairs scoring >= DEDUP_MIN_SCORE are linked,
+       clusters are connected components (min id label propagation)
+    5. survivor: row with most non-blank columns, then newest ts
+
+merge_duplicates() merges clusters in one transaction: blank columns of survivor
+are filled from its duplicates (newest first), references (ref_tab/ref_key/ref_val
+of any table, ref_*_sub of g_relation) are remapped to survivor, duplicates deleted.
+
+Usage:
+    python app_dedup.py --table g_person [--file-db cs-faculty.duckdb] [--min-score 0.92] [--merge]
+"""
+import argparse
+import time
+from datetime import datetime
+
+from app_config import *
+from app_helper import DBConn, run_write, get_uid, QUERY_CACHE, log_print
+
+# SQL expressions over normalized columns (see _normalize_sql), NULL: no key
+BLOCKING_KEYS = {
+    "g_person": {
+        "url": "url_key",
+        "email": "email_key",
+        "name_org": "last_name || '|' || coalesce(org_key, '')",
+    },
+    "g_work": {
+        "url": "url_key",
+        "doi": "doi",
+        "arxiv": "arxiv_id",
+        "title": "title_key",
+    },
+    "g_entity": {
+        "url": "url_key",
+        "name": "entity_type || '|' || name_norm",
+    },
+}
+# identifiers: pair sharing one is scored 0.5 + 0.5 * name similarity
+ID_KEYS = ("url_key", "email_key", "doi", "arxiv_id")
+
+def _clean_sql(expr):
+    """lower case, accents removed, non-alphanumeric to blank, blanks collapsed"""
+    return f"""trim(regexp_replace(regexp_replace(lower(strip_accents(coalesce({expr}, ''))),
+                '[^a-z0-9,]+', ' ', 'g'), '\\s+', ' ', 'g'))"""
+
+def _normalize_sql(table_name):
+    """select of id, ts and normalized columns of table_name
+    """
+    cols = set(COLUMN_PROPS[table_name].keys())
+    opt = lambda col, expr: expr if col in cols else f"NULL::varchar"
+    return f"""
+        select id, ts, name_norm, url_key, email_key, org_key, entity_type, doi, arxiv_id,
+            list_extract(str_split(name_norm, ' '), -1) as last_name,
+            list_aggr(list_slice(str_split(name_norm, ' '), 1, 4), 'string_agg', ' ') as title_key
+        from (
+            select id, ts,
+                -- "Last, First" -> "first last"
+                trim(replace(case when n like '%,%'
+                    then split_part(n, ',', 2) || ' ' || split_part(n, ',', 1) else n end, ',', ' ')) as name_norm,
+                nullif(regexp_replace(regexp_replace(lower(trim(coalesce(url, ''))),
+                    '^https?://(www\\.)?', ''), '(/index\\.html?|/)+$', ''), '') as url_key,
+                {opt("email", "nullif(lower(trim(email)), '')")} as email_key,
+                {opt("org", f"nullif({_clean_sql('org')}, '')")} as org_key,
+                {opt("entity_type", "entity_type")} as entity_type,
+                nullif(lower(regexp_extract(url, '10\\.[0-9]{{4,9}}/[^\\s?#]+', 0)), '') as doi,
+                nullif(regexp_extract(url, 'arxiv\\.org/(abs|pdf)/([0-9]{{4}}\\.[0-9]{{4,5}})', 2), '') as arxiv_id
+            from (select *, {_clean_sql('name')} as n from {table_name}) t
+        ) t
+    """
+
+def _survivor_rank_sql(table_name):
+    """number of non-blank data columns, higher is better survivor"""
+    data_cols = [c for c in COLUMN_PROPS[table_name].keys() if c not in SYS_COLS]
+    return " + ".join([f"(coalesce({c}, '') <> '')::int" for c in data_cols])
+
+def find_duplicates(table_name, min_score=DEDUP_MIN_SCORE, max_block=DEDUP_MAX_BLOCK,
+                    file_db=FILE_DB):
+    """find clusters of duplicate rows in table_name
+
+    Returns:
+        (clusters, stats):
+        clusters: DataFrame of cluster_id, id, is_survivor, score (best link), name, url, ts,
+            ordered by cluster, survivor first
+        stats: dict of rows, pairs (candidates), links (>= min_score), clusters, rows in clusters, ms
+    """
+    if table_name not in BLOCKING_KEYS:
+        raise Exception(f"[ERROR] Duplicate detection not supported for {table_name}")
+    t0 = time.perf_counter()
+    keys_sql = " union all ".join([
+        f"select id, '{k}:' || ({expr}) as bkey from er_norm where ({expr}) is not null"
+        for k, expr in BLOCKING_KEYS[table_name].items()])
+    id_match = " or ".join([f"a.{k} = b.{k}" for k in ID_KEYS])
+    with DBConn(file_db) as _conn:
+        try:
+            _conn.execute(f"create or replace temp table er_norm as {_normalize_sql(table_name)};")
+            _conn.execute(f"""
+                create or replace temp table er_pairs as
+                with keys as ({keys_sql}),
+                blocks as (
+                    select bkey from keys group by bkey having count(*) between 2 and {int(max_block)}
+                )
+                select distinct a.id as id_a, b.id as id_b
+                from keys a join keys b on a.bkey = b.bkey and a.id < b.id
+                where a.bkey in (select bkey from blocks);
+            """)
+            _conn.execute(f"""
+                create or replace temp table er_links as
+                select id_a, id_b, score from (
+                    select p.id_a, p.id_b,
+                        case when {id_match}
+                            then 0.5 + 0.5 * jaro_winkler_similarity(a.name_norm, b.name_norm)
+                            else jaro_winkler_similarity(a.name_norm, b.name_norm) end as score
+                    from er_pairs p
+                    join er_norm a on a.id = p.id_a
+                    join er_norm b on b.id = p.id_b
+                ) s
+                where score >= ?;
+            """, [min_score])
+            # connected components: every node takes the smallest label of its neighbors
+            _conn.execute("""
+                create or replace temp table er_label as
+                select id, id as cid from (select id_a as id from er_links union select id_b from er_links);
+            """)
+            while True:
+                changed = _conn.execute("""
+                    update er_label set cid = m.cid
+                    from (
+                        select e.id, min(l.cid) as cid
+                        from (select id_a as id, id_b as nb from er_links
+                              union all select id_b, id_a from er_links) e
+                        join er_label l on l.id = e.nb
+                        group by e.id
+                    ) m
+                    where er_label.id = m.id and m.cid < er_label.cid;
+                """).fetchone()[0]
+                if not changed:
+                    break
+            clusters = _conn.execute(f"""
+                select l.cid as cluster_id, t.id,
+                    row_number() over (partition by l.cid
+                        order by {_survivor_rank_sql(table_name)} desc, t.ts desc nulls last) = 1 as is_survivor,
+                    s.score, t.name, t.url, t.ts
+                from er_label l
+                join {table_name} t on t.id = l.id
+                join (select id, max(score) as score from (
+                        select id_a as id, score from er_links union all select id_b, score from er_links
+                      ) group by id) s on s.id = l.id
+                order by cluster_id, is_survivor desc, t.id;
+            """).df()
+            stats = {
+                "rows": _conn.execute("select count(*) from er_norm").fetchone()[0],
+                "pairs": _conn.execute("select count(*) from er_pairs").fetchone()[0],
+                "links": _conn.execute("select count(*) from er_links").fetchone()[0],
+            }
+        finally:
+            for t in ["er_norm", "er_pairs", "er_links", "er_label"]:
+                _conn.execute(f"drop table if exists {t};")
+    stats.update({"clusters": int(clusters["cluster_id"].nunique()), "rows_in_clusters": len(clusters),
+                  "ms": round((time.perf_counter() - t0) * 1000, 1)})
+    return clusters, stats
+
+def ref_tables():
+    """tables referencing other rows by (ref_tab, ref_key, ref_val),
+    with suffix of each reference column set ("" and "_sub" for g_relation)
+    """
+    refs = {}
+    for table_name, col_props in COLUMN_PROPS.items():
+        suffixes = [s for s in ["", "_sub"]
+                    if all(f"ref_{c}{s}" in col_props for c in ["tab", "key", "val"])]
+        if suffixes:
+            refs[table_name] = suffixes
+    return refs
+
+def remap_refs(_conn, table_name, map_table):
+    """point references to rows of table_name from old_id to new_id of map_table,
+    by id, name or url as given by ref_key, run inside caller's transaction
+    """
+    _conn.execute(f"""
+        create or replace temp table er_remap as
+        select m.old_id, m.new_id, o.name as old_name, o.url as old_url,
+            n.name as new_name, n.url as new_url
+        from {map_table} m
+        join {table_name} o on o.id = m.old_id
+        join {table_name} n on n.id = m.new_id;
+    """)
+    # relations rewritten by this remap, only they can have become duplicates
+    _conn.execute("create or replace temp table er_rel (id varchar);")
+    touched = []
+    for ref_table, suffixes in ref_tables().items():
+        for s in suffixes:
+            # one equi-join per key column (OR of conditions would be a nested loop join)
+            for key in ["id", "name", "url"]:
+                cond = f"""
+                    {ref_table}.ref_tab{s} = '{table_name}'
+                        and {ref_table}.ref_key{s} = '{key}'
+                        and {ref_table}.ref_val{s} = x.old_{key}
+                        and x.old_{key} <> x.new_{key}
+                """
+                if ref_table == TABLE_RELATION:
+                    _conn.execute(f"""
+                        insert into er_rel
+                        select {ref_table}.id from {ref_table} join er_remap x on {cond};
+                    """)
+                _conn.execute(f"""
+                    update {ref_table} set ref_val{s} = x.new_{key}
+                    from er_remap x
+                    where {cond};
+                """)
+        touched.append(ref_table)
+    # a rewritten relation may now duplicate another one: drop it, keep the newest
+    # if all copies were rewritten; duplicates which existed before are left alone
+    rel_cols = "rel_type, ref_tab, ref_key, ref_val, ref_tab_sub, ref_key_sub, ref_val_sub"
+    _conn.execute(f"""
+        delete from {TABLE_RELATION} where id in (
+            select id from (
+                select r.id, e.id is not null as is_rewritten,
+                    row_number() over (partition by {rel_cols}
+                        order by e.id is not null, r.ts desc nulls last, r.id) as rn
+                from {TABLE_RELATION} r
+                left join (select distinct id from er_rel) e on e.id = r.id
+                where r.ref_tab = '{table_name}' or r.ref_tab_sub = '{table_name}'
+            ) r where rn > 1 and is_rewritten
+        );
+    """)
+    _conn.execute("drop table er_rel;")
+    _conn.execute("drop table er_remap;")
+    return touched
+
+def merge_duplicates(table_name, clusters, file_db=FILE_DB):
+    """merge clusters (from find_duplicates) into their survivors in one transaction,
+    return number of rows removed
+    """
+    import pyarrow as pa
+    survivors = clusters[clusters["is_survivor"]].set_index("cluster_id")["id"]
+    dups = clusters[~clusters["is_survivor"]]
+    if dups.empty:
+        return 0
+    mapping = pa.table({"old_id": dups["id"].astype(str).to_list(),
+                        "new_id": dups["cluster_id"].map(survivors).astype(str).to_list()})
+    data_cols = [c for c in COLUMN_PROPS[table_name].keys() if c not in SYS_COLS]
+    set_clause = ", ".join([f"{c} = coalesce(nullif({table_name}.{c}, ''), f.{c})" for c in data_cols])
+    fill_cols = ", ".join([f"arg_max(d.{c}, d.ts) filter (where coalesce(d.{c}, '') <> '') as {c}"
+                            for c in data_cols])
+    touched = [table_name]
+    ts, uid = str(datetime.now()), get_uid()
+
+    def _merge(_conn):
+        _conn.register("v_er_map", mapping)
+        try:
+            _conn.execute("create or replace temp table er_map as select * from v_er_map;")
+        finally:
+            _conn.unregister("v_er_map")
+        # fill blanks of survivor from duplicates, newest first
+        _conn.execute(f"""
+            update {table_name} set {set_clause}, ts = ?, uid = ?
+            from (
+                select m.new_id, {fill_cols}
+                from er_map m join {table_name} d on d.id = m.old_id
+                group by m.new_id
+            ) f
+            where {table_name}.id = f.new_id;
+        """, [ts, uid])
+        touched.extend(remap_refs(_conn, table_name, "er_map"))
+        n = _conn.execute(f"""
+            delete from {table_name} where id in (select old_id from er_map);
+        """).fetchone()[0]
+        _conn.execute("drop table er_map;")
+        return n
+
+    try:
+        return run_write(_merge, file_db=file_db)
+    finally:
+        QUERY_CACHE.bump(*set(touched))
+
+def main():
+    parser = argparse.ArgumentParser(description="Find (and merge) duplicate rows")
+    parser.add_argument("--table", required=True, choices=list(BLOCKING_KEYS.keys()))
+    parser.add_argument("--file-db", default=FILE_DB)
+    parser.add_argument("--min-score", type=float, default=DEDUP_MIN_SCORE)
+    parser.add_argument("--merge", action="store_true", help="merge clusters into survivors")
+    args = parser.parse_args()
+
+    clusters, stats = find_duplicates(args.table, min_score=args.min_score, file_db=args.file_db)
+    print(f"{args.table}: {stats}")
+    print(clusters.head(30).to_string())
+    if args.merge:
+        t = time.perf_counter()
+        n = merge_duplicates(args.table, clusters, file_db=args.file_db)
+        log_print(f"merged {stats['clusters']} clusters of {args.table}, {n} rows removed "
+                  f"in {time.perf_counter() - t:.1f} sec")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Streaming export of a table through DuckDB COPY ... TO a temp file
+
+Formats (EXPORT_FORMATS): CSV, gzip CSV, Parquet (zstd).
+DuckDB writes the file chunk by chunk, no DataFrame or CSV string of the table
+is built in Python, so RSS stays flat for multi-million-row tables.
+
+By default (EXPORT_SERVER_PORT = None) the file is handed to download_button,
+which in Streamlit (1.17) reads it into memory. For large exports set
+EXPORT_SERVER_PORT to serve files by ExportServer: an HTTP server thread
+(EXPORT_SERVER_HOST/PORT) which sends registered files by sendfile(),
+links expire after EXPORT_MAX_AGE_SEC.
+
+Usage:
+    python app_export.py --table g_relation [--format "Parquet (zstd)"] [--file-db cs-faculty.duckdb] [--out dir]
+"""
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+from uuid import uuid4
+
+from app_config import *
+from app_helper import DBConn, query_df, log_print
+
+MIME_TYPES = {"csv": "text/csv", "csv.gz": "application/gzip", "parquet": "application/octet-stream"}
+
+def export_dir():
+    path = os.path.join(tempfile.gettempdir(), "csinfo_export")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def cleanup_exports(max_age=EXPORT_MAX_AGE_SEC):
+    """remove exported files older than max_age seconds
+    """
+    path = export_dir()
+    now = time.time()
+    for name in os.listdir(path):
+        file_path = os.path.join(path, name)
+        try:
+            if now - os.path.getmtime(file_path) > max_age:
+                os.remove(file_path)
+        except OSError:
+            pass
+
+def _check_table(table_name):
+    if not re.match(r"^[a-zA-Z_]\w*$", table_name or ""):
+        raise Exception(f"[ERROR] Invalid table name: {table_name}")
+
+def export_table(table_name, fmt=list(EXPORT_FORMATS.keys())[0], file_db=FILE_DB):
+    """copy all rows of table_name to a new file in export_dir()
+
+    Returns:
+        dict of path, file_name, mime, rows, nbytes, ms
+    """
+    _check_table(table_name)
+    if fmt not in EXPORT_FORMATS:
+        raise Exception(f"[ERROR] Unknown export format {fmt}, use one of {list(EXPORT_FORMATS.keys())}")
+    ext, options = EXPORT_FORMATS[fmt]
+    cleanup_exports()
+    ts = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    file_name = f"{table_name}_{ts}.{ext}"
+    # unique path, two sessions may export same table in same second
+    path = os.path.join(export_dir(), f"{uuid4().hex[:8]}_{file_name}")
+    t = time.perf_counter()
+    with DBConn(file_db) as _conn:
+        rows = _conn.execute(f"""
+            copy (select * from {table_name}) to '{path.replace("'", "''")}' ({options});
+        """).fetchone()[0]
+    return {"path": path, "file_name": file_name, "mime": MIME_TYPES.get(ext, "application/octet-stream"),
+            "rows": rows, "nbytes": os.path.getsize(path),
+            "ms": round((time.perf_counter() - t) * 1000, 1)}
+
+def preview_table(table_name, num_rows=EXPORT_PREVIEW_ROWS):
+    """first num_rows rows of table_name
+    """
+    _check_table(table_name)
+    return query_df(f"select * from {table_name} limit {int(num_rows)};", use_cache=False)
+
+class ExportRequestHandler(BaseHTTPRequestHandler):
+    """GET /<token>/<file_name>: send registered file
+    """
+    def do_GET(self):
+        parts = self.path.lstrip("/").split("/")
+        entry = self.server.lookup(parts[0]) if len(parts) == 2 else None
+        if not entry or not os.path.exists(entry["path"]):
+            self.send_error(404, "Export not found or expired")
+            return
+        with open(entry["path"], "rb") as f:
+            self.send_response(200)
+            self.send_header("Content-Type", entry["mime"])
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.send_header("Content-Disposition", f"attachment; filename=\"{unquote(parts[1])}\"")
+            self.end_headers()
+            self.wfile.flush()
+            try:
+                # kernel copies file to socket
+                self.connection.sendfile(f)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def log_message(self, format, *args):
+        pass
+
+class ExportServer(ThreadingHTTPServer):
+    """serve exported files by token, one server thread per process
+    """
+    daemon_threads = True
+
+    def __init__(self, host=EXPORT_SERVER_HOST, port=EXPORT_SERVER_PORT):
+        port = port or 0
+        try:
+            super().__init__((host, port), ExportRequestHandler)
+        except OSError as e:
+            # port taken, e.g. by another Streamlit process
+            log_print(f"[WARN] export server port {port} not available ({e}), using a free port")
+            super().__init__((host, 0), ExportRequestHandler)
+        log_print(f"export server listening on http://{host}:{self.server_address[1]}")
+        self.host = host
+        self.files = {}     # token -> dict(path, mime, expires)
+        self.lock = threading.Lock()
+
+    def register(self, path, file_name, mime, max_age=EXPORT_MAX_AGE_SEC):
+        """return download URL of path
+        """
+        token = uuid4().hex
+        now = time.time()
+        with self.lock:
+            for k in [k for k, v in self.files.items() if v["expires"] < now]:
+                del self.files[k]
+            self.files[token] = {"path": path, "mime": mime, "expires": now + max_age}
+        return f"http://{self.host}:{self.server_address[1]}/{token}/{quote(file_name)}"
+
+    def lookup(self, token):
+        with self.lock:
+            entry = self.files.get(token)
+        if entry and entry["expires"] >= time.time():
+            return entry
+        return None
+
+_EXPORT_SERVER = None
+_EXPORT_SERVER_LOCK = threading.Lock()
+
+def get_export_server():
+    """ExportServer of this process, started on first use
+    """
+    global _EXPORT_SERVER
+    with _EXPORT_SERVER_LOCK:
+        if _EXPORT_SERVER is None:
+            _EXPORT_SERVER = ExportServer()
+            threading.Thread(target=_EXPORT_SERVER.serve_forever, name="export-server",
+                             daemon=True).start()
+    return _EXPORT_SERVER
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a table by DuckDB COPY")
+    parser.add_argument("--table", required=True)
+    parser.add_argument("--format", default=list(EXPORT_FORMATS.keys())[0], choices=list(EXPORT_FORMATS.keys()))
+    parser.add_argument("--file-db", default=FILE_DB)
+    parser.add_argument("--out", default="", help="target directory, default: current directory")
+    args = parser.parse_args()
+
+    export = export_table(args.table, fmt=args.format, file_db=args.file_db)
+    out = os.path.join(args.out or ".", export["file_name"])
+    shutil.move(export["path"], out)
+    log_print(f"exported {export['rows']} rows of {args.table} to {out} "
+              f"({export['nbytes'] / 2**20:.1f} MB) in {export['ms'] / 1000:.1f} sec")
+
+if __name__ == "__main__":
+    main()
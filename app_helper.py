@@ -1,34 +1,746 @@
 from datetime import date, datetime, timedelta
-from dateutil.relativedelta import relativedelta
 import re
+from functools import lru_cache
+from collections import OrderedDict
+from types import MappingProxyType
 from pathlib import Path
 import pandas as pd
 import os
+import threading
+import queue
+import atexit
+import json
+import socket
+import struct
+import time
+import hashlib
+from contextlib import contextmanager
+from concurrent.futures import Future
 
-import sqlite3
-import duckdb
+# sqlite3, duckdb are imported on first connection
 
 from app_config import *
 
 #######################################################
 #  Helper functions  - database
 #######################################################
-class DBConn(object):
+class DBPool(object):
+    """Process-wide DuckDB handle shared by all Streamlit sessions
+
+    The database file is opened once per process,
+    each thread (one per script run) gets its own cursor,
+    cursors of finished threads are closed on next checkout.
+    """
     def __init__(self, file_db=FILE_DB):
+        if not Path(file_db).exists():
+            raise Exception(f"Database file not found: {file_db}")
+        import duckdb
+        self.file_db = file_db
+        self.conn = duckdb.connect(file_db)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cursors = {}  # thread ident -> (thread, cursor)
+
+    def cursor(self):
+        """return cursor owned by current thread
+        """
+        if self.conn is None:
+            raise Exception(f"Database pool closed: {self.file_db}")
+        cur = getattr(self._local, "cursor", None)
+        if cur is None:
+            cur = self.conn.cursor()
+            self._local.cursor = cur
+            with self._lock:
+                self._prune()
+                self._cursors[threading.get_ident()] = (threading.current_thread(), cur)
+        return cur
+
+    def _prune(self):
+        for ident, (thread, cur) in list(self._cursors.items()):
+            if not thread.is_alive():
+                self._cursors.pop(ident, None)
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+
+    def close(self):
+        with self._lock:
+            for _, cur in self._cursors.values():
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+            self._cursors = {}
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+_DB_POOLS = {}
+_DB_POOLS_LOCK = threading.Lock()
+
+def get_db_pool(file_db=FILE_DB):
+    """return the process-wide DBPool for file_db, open it on first use
+    """
+    key = str(Path(file_db).resolve())
+    pool = _DB_POOLS.get(key)
+    if pool is None:
+        with _DB_POOLS_LOCK:
+            pool = _DB_POOLS.get(key)
+            if pool is None:
+                pool = DBPool(file_db)
+                _DB_POOLS[key] = pool
+    return pool
+
+@atexit.register
+def close_db_pools():
+    close_db_writers()
+    with _DB_POOLS_LOCK:
+        for pool in _DB_POOLS.values():
+            pool.close()
+        _DB_POOLS.clear()
+
+#######################################################
+#  client of database server (see app_server.py)
+#######################################################
+def send_msg(sock, header, body=b""):
+    """send message: JSON header and binary body, each prefixed by 4-byte length,
+    date/time values (e.g. of st.time_input) in header are sent as ISO strings
+    """
+    data = json.dumps(header, default=str).encode("utf-8")
+    sock.sendall(struct.pack("!I", len(data)) + data + struct.pack("!I", len(body)) + body)
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(min(n - len(buf), 1 << 20))
+        if not chunk:
+            raise EOFError("connection closed")
+        buf.extend(chunk)
+    return bytes(buf)
+
+def recv_msg(sock):
+    """receive message sent by send_msg(), return (header, body)
+    """
+    n = struct.unpack("!I", _recv_exact(sock, 4))[0]
+    header = json.loads(_recv_exact(sock, n).decode("utf-8"))
+    n = struct.unpack("!I", _recv_exact(sock, 4))[0]
+    body = _recv_exact(sock, n) if n else b""
+    return header, body
+
+def arrow_to_bytes(table):
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def arrow_from_bytes(body):
+    import pyarrow as pa
+    return pa.ipc.open_stream(body).read_all()
+
+class DBClient(object):
+    """Connection to database server over Unix socket,
+    exposes the subset of DuckDB connection API used by this app.
+    Results are transferred as Arrow IPC record batches.
+    The server keeps one cursor per client connection, 
+    so begin/commit/rollback and registered views behave as on a local cursor.
+    """
+    def __init__(self, socket_path=DB_SERVER_SOCKET):
+        self.socket_path = socket_path
+        self.sock = None
+        self._result = None
+
+    def _request(self, header, body=b""):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(self.socket_path)
+        try:
+            send_msg(self.sock, header, body)
+            resp, body = recv_msg(self.sock)
+        except (OSError, EOFError):
+            self.close()
+            raise
+        if resp.get("error"):
+            raise Exception(resp["error"])
+        return resp, body
+
+    def execute(self, sql_stmt, params=None):
+        _, body = self._request({"op": "execute", "sql": sql_stmt, "params": params})
+        self._result = arrow_from_bytes(body) if body else None
+        return self
+
+    def execute_write(self, statements):
+        """run list of (sql_statement, params) in one transaction by server's DBWriter
+        """
+        self._request({"op": "write", "statements": [[s, p] for s, p in statements]})
+
+    def generations(self):
+        """table generations tracked by server, bumped on every write
+        """
+        resp, _ = self._request({"op": "generations"})
+        return resp.get("generations", {})
+
+    def register(self, view_name, df):
+        import pyarrow as pa
+        table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+        self._request({"op": "register", "name": view_name}, arrow_to_bytes(table))
+
+    def unregister(self, view_name):
+        self._request({"op": "unregister", "name": view_name})
+
+    def begin(self):
+        self._request({"op": "begin"})
+
+    def commit(self):
+        self._request({"op": "commit"})
+
+    def rollback(self):
+        self._request({"op": "rollback"})
+
+    def arrow(self):
+        return self._result
+
+    def df(self):
+        return self._result.to_pandas() if self._result is not None else pd.DataFrame()
+
+    def fetchall(self):
+        if self._result is None:
+            return []
+        return list(zip(*[c.to_pylist() for c in self._result.columns]))
+
+    def fetchone(self):
+        rows = self.fetchall()
+        return rows[0] if rows else None
+
+    @property
+    def description(self):
+        if self._result is None:
+            return None
+        return [(f.name, str(f.type), None, None, None, None, None) for f in self._result.schema]
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+
+_DB_CLIENTS = threading.local()
+
+def get_db_client(socket_path=None):
+    """return DBClient owned by current thread, default socket_path: DB_SERVER_SOCKET
+    """
+    if socket_path is None:
+        socket_path = DB_SERVER_SOCKET
+    clients = getattr(_DB_CLIENTS, "clients", None)
+    if clients is None:
+        clients = _DB_CLIENTS.clients = {}
+    client = clients.get(socket_path)
+    if client is None:
+        client = clients[socket_path] = DBClient(socket_path)
+    return client
+
+class DBConn(object):
+    def __init__(self, file_db=FILE_DB, pooled=True, socket_path=None):
         """Support only DuckDB and SQLite
+
+        DuckDB connections are thread-local cursors checked out from DBPool
+        (set pooled=False to open/close the file per call),
+        or thread-local DBClient when socket_path of database server is set,
+        socket_path defaults to DB_SERVER_SOCKET at call time (cleared by app_server)
         """
+        if socket_path is None:
+            socket_path = DB_SERVER_SOCKET
+        self.client = bool(socket_path) and file_db == FILE_DB
+        self.pooled = pooled and file_db.endswith("duckdb")
+        if self.client:
+            self.conn = get_db_client(socket_path)
+            return
         if not Path(file_db).exists():
             raise Exception(f"Database file not found: {file_db}")
-        if file_db.endswith("duckdb"):
+        if self.pooled:
+            self.conn = get_db_pool(file_db).cursor()
+        elif file_db.endswith("duckdb"):
+            import duckdb
             self.conn = duckdb.connect(file_db)
         else:
+            import sqlite3
             self.conn = sqlite3.connect(file_db)
 
     def __enter__(self):
         return self.conn
 
     def __exit__(self, type, value, traceback):
-        self.conn.close()
+        if not (self.pooled or self.client):
+            self.conn.close()
+        elif type is not None:
+            # cursor is reused by next call, do not leave a transaction open
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+
+class DBWriter(object):
+    """Single writer thread per database file
+
+    Write jobs from all sessions are queued and executed by one thread 
+    owning the only write cursor, so sessions do not collide on writes.
+    Queued jobs are committed in groups (one transaction per group);
+    if a group fails, its jobs are rerun one transaction each 
+    so that only the failing job reports an error.
+
+    A job is a callable fn(conn) whose return value is delivered via Future.
+    """
+    def __init__(self, file_db=FILE_DB, 
+                 max_batch=WRITE_QUEUE_MAX_BATCH, 
+                 max_wait=WRITE_QUEUE_MAX_WAIT_SEC):
+        self.file_db = file_db
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.num_jobs = 0
+        self.num_commits = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def in_writer_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn):
+        if not self._thread.is_alive():
+            raise Exception(f"Database writer stopped: {self.file_db}")
+        fut = Future()
+        self._queue.put((fn, fut))
+        return fut
+
+    def _next_batch(self):
+        job = self._queue.get()
+        if job is None:
+            return None
+        batch = [job]
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get(timeout=self.max_wait)
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(job)
+        return batch
+
+    def _commit(self, conn, batch):
+        conn.begin()
+        try:
+            results = [fn(conn) for fn, _ in batch]
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        self.num_commits += 1
+        return results
+
+    def _run(self):
+        conn = get_db_pool(self.file_db).cursor()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            batch = [(fn, fut) for fn, fut in batch if fut.set_running_or_notify_cancel()]
+            self.num_jobs += len(batch)
+            try:
+                for (_, fut), res in zip(batch, self._commit(conn, batch)):
+                    fut.set_result(res)
+            except Exception:
+                # rerun jobs one by one to isolate the failure
+                for job in batch:
+                    try:
+                        job[1].set_result(self._commit(conn, [job])[0])
+                    except Exception as ex:
+                        job[1].set_exception(ex)
+
+    def close(self, timeout=10):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+_DB_WRITERS = {}
+
+def get_db_writer(file_db=FILE_DB):
+    """return the process-wide DBWriter for file_db, start it on first use
+    """
+    key = str(Path(file_db).resolve())
+    writer = _DB_WRITERS.get(key)
+    if writer is None:
+        with _DB_POOLS_LOCK:
+            writer = _DB_WRITERS.get(key)
+            if writer is None:
+                writer = DBWriter(file_db)
+                _DB_WRITERS[key] = writer
+    return writer
+
+def close_db_writers():
+    for writer in list(_DB_WRITERS.values()):
+        writer.close()
+    _DB_WRITERS.clear()
+
+def run_write(fn, file_db=FILE_DB):
+    """run fn(conn) in a write transaction and return its result,
+    through the single writer thread when DB_WRITE_QUEUE is on
+    """
+    if DB_WRITE_QUEUE and file_db.endswith("duckdb") and not (DB_SERVER_SOCKET and file_db == FILE_DB):
+        writer = get_db_writer(file_db)
+        if not writer.in_writer_thread():
+            return writer.submit(fn).result()
+    with DBConn(file_db) as _conn:
+        _conn.begin()
+        res = fn(_conn)
+        _conn.commit()
+    return res
+
+def execute_write(statements, file_db=FILE_DB):
+    """execute list of (sql_statement, params) in one write transaction
+    """
+    context = get_trace_context()   # writer thread has no context of its own
+    if DB_SERVER_SOCKET and file_db == FILE_DB:
+        # executed by server's writer thread
+        t = time.perf_counter()
+        get_db_client().execute_write(statements)
+        ms = (time.perf_counter() - t) * 1000 / max(1, len(statements))
+        for sql_statement, params in statements:
+            trace_sql(sql_statement, params, ms=ms, kind="write", context=context)
+        return
+
+    def _execute(_conn):
+        for sql_statement, params in statements:
+            t = time.perf_counter()
+            _conn.execute(sql_statement, params)
+            trace_sql(sql_statement, params, ms=(time.perf_counter() - t) * 1000, 
+                      kind="write", context=context)
+    return run_write(_execute, file_db=file_db)
+
+@lru_cache(maxsize=1024)
+def build_sql(sql_type, table_name, cols=(), key_cols=(), version_col=""):
+    """build parameterized SQL statement, values are bound as '?' placeholders
+
+    cached per (sql_type, table_name, cols, key_cols, version_col) so that each
+    table/operation/column-set maps to one statement text
+
+    Inputs:
+        sql_type: select, insert, update, delete
+        cols (tuple): columns to select/insert/update
+        key_cols (tuple): columns in where clause (and-ed equality)
+        version_col (str): column compared with the value read before (NULL as ''),
+            bound after key_cols, for optimistic concurrency check
+    """
+    where_clause = " and ".join([f"{c} = ?" for c in key_cols]) or "1=1"
+    if version_col:
+        where_clause += f" and coalesce({version_col}, '') = ?"
+    if sql_type == "select":
+        return f"select {', '.join(cols) or '*'} from {table_name} where {where_clause};"
+    elif sql_type == "insert":
+        return f"insert into {table_name} ({', '.join(cols)}) values ({', '.join(['?'] * len(cols))});"
+    elif sql_type == "update":
+        set_clause = ", ".join([f"{c} = ?" for c in cols])
+        return f"update {table_name} set {set_clause} where {where_clause};"
+    elif sql_type == "delete":
+        return f"delete from {table_name} where {where_clause};"
+    raise Exception(f"Unsupported sql_type: {sql_type}")
+
+def sql_tables(sql_stmt):
+    """return set of table names referenced by a SQL statement
+    """
+    return set([t.lower() for t in 
+        re.findall(r"\b(?:from|join|into|update|table)\s+([a-zA-Z_]\w*)", sql_stmt, re.I)])
+
+def normalize_sql(sql_stmt):
+    return " ".join(sql_stmt.split()).rstrip(";").strip()
+
+class QueryCache(object):
+    """Process-wide LRU cache of query results (DataFrame), shared by all sessions
+
+    Entries are keyed by normalized SQL and bound parameters
+    (i.e. table, filter and projection), and remember the generation 
+    of every table they read. Write paths call bump(table) so that 
+    only entries reading a modified table become stale.
+
+    Cached frames are read-only: get() returns a shallow copy, 
+    whose columns are the cached (Arrow-backed) arrays, not copies of them.
+    Adding or replacing columns is safe, changing cells in place is not.
+    The frame with NULLs filled (fill_blanks) is kept with its entry, 
+    so that grids of all sessions share it too.
+
+    Sessions holding an entry during a script run are counted by holder 
+    (see release()), held entries are not evicted: a session would 
+    keep the frame alive anyway and the next one would load a second copy.
+    Eviction is LRU, bounded by total DataFrame bytes.
+    """
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> dict(df, filled, nbytes, gens, holders)
+        self._held = {}                # holder -> set of keys
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(sql_stmt, params=None):
+        return (normalize_sql(sql_stmt), tuple(params or []))
+
+    def generation(self, table_name):
+        return self._generations.get(table_name.lower(), 0)
+
+    def generations(self):
+        with self._lock:
+            return dict(self._generations)
+
+    def sync_generations(self, generations):
+        """adopt generations tracked elsewhere (database server)
+        """
+        with self._lock:
+            for t, g in generations.items():
+                if g > self._generations.get(t, 0):
+                    self._generations[t] = g
+
+    def bump(self, *table_names):
+        with self._lock:
+            for t in table_names:
+                t = t.lower()
+                self._generations[t] = self._generations.get(t, 0) + 1
+
+    def _pop(self, key):
+        entry = self._entries.pop(key)
+        self.nbytes -= entry["nbytes"]
+        for h in entry["holders"]:
+            self._held.get(h, set()).discard(key)
+        return entry
+
+    def get(self, sql_stmt, params=None, fill=False, holder=None):
+        """shallow copy of cached frame (NULLs filled if fill), None if missing or stale, 
+        holder (e.g. session id) holds the entry until release(holder)
+        """
+        key = self.make_key(sql_stmt, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not all(self.generation(t) == g for t,g in entry["gens"].items()):
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if holder:
+                entry["holders"].add(holder)
+                self._held.setdefault(holder, set()).add(key)
+            df, filled = entry["df"], entry["filled"]
+        if fill and filled is None:
+            filled = fill_blanks(df)
+            self._set_filled(key, entry, filled)
+        return (filled if fill else df).copy(deep=False)
+
+    def _set_filled(self, key, entry, filled):
+        # only columns with NULLs are new arrays
+        nbytes = sum([int(filled[c].memory_usage(index=False, deep=True)) 
+                      for c in entry["df"].columns if entry["df"][c].hasnans])
+        with self._lock:
+            if entry["filled"] is None and self._entries.get(key) is entry:
+                entry["filled"] = filled
+                entry["nbytes"] += nbytes
+                self.nbytes += nbytes
+
+    def put(self, sql_stmt, params, df, gens, holder=None):
+        """gens: table generations captured before the query ran,
+        df must not be changed by caller afterwards
+        """
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        key = self.make_key(sql_stmt, params)
+        entry = {"df": df, "filled": None, "nbytes": nbytes, "gens": gens, "holders": set()}
+        with self._lock:
+            if key in self._entries:
+                old = self._pop(key)
+                entry["holders"] = old["holders"]
+            if holder:
+                entry["holders"].add(holder)
+            for h in entry["holders"]:
+                self._held.setdefault(h, set()).add(key)
+            self._entries[key] = entry
+            self.nbytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        for key in list(self._entries.keys()):
+            if self.nbytes <= self.max_bytes:
+                break
+            if not self._entries[key]["holders"]:
+                self._pop(key)
+
+    def release(self, holder):
+        """holder (session) no longer uses the frames it got
+        """
+        with self._lock:
+            for key in self._held.pop(holder, set()):
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["holders"].discard(holder)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._held.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            held = [e for e in self._entries.values() if e["holders"]]
+            return {"entries": len(self._entries), "nbytes": self.nbytes, 
+                    "hits": self.hits, "misses": self.misses,
+                    "held_entries": len(held), "held_nbytes": sum([e["nbytes"] for e in held]),
+                    "holders": len(self._held)}
+
+QUERY_CACHE = QueryCache()
+
+def fetch_arrow(sql_stmt, params=None, file_db=FILE_DB):
+    """run a select statement and return pyarrow Table, 
+    DuckDB hands over columnar result without per-row Python objects
+    """
+    with DBConn(file_db) as _conn:
+        return _conn.execute(sql_stmt, params).arrow()
+
+def _arrow_dtype_mapper(arrow_type):
+    import pyarrow as pa
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+def arrow_to_df(table, categories=None):
+    """convert pyarrow Table to DataFrame:
+        string columns -> string[pyarrow] (no Python str objects)
+        LOV columns -> category (if values repeat)
+    NULLs are kept, see fill_blanks() for display
+    """
+    categories = LOV_COLUMNS if categories is None else categories
+    df = table.to_pandas(types_mapper=_arrow_dtype_mapper)
+    for col in df.columns:
+        # skip LOV with free-form values (e.g. ref_val), category would not save memory
+        if col in categories and df[col].nunique() <= len(df) // 2:
+            df[col] = df[col].astype("category")
+    return df
+
+def fill_blanks(df):
+    """replace NULL by empty string at display boundary (grid, form, download),
+    columns without NULLs are shared with df (shallow copy)
+    """
+    with profile_phase("fill_blanks"):
+        df = df.copy(deep=False)
+        for col in df.columns:
+            s = df[col]
+            if not s.hasnans:
+                continue
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                if "" not in s.cat.categories:
+                    s = s.cat.add_categories([""])
+                df[col] = s.fillna("")
+            elif isinstance(s.dtype, pd.StringDtype):
+                df[col] = s.fillna("")
+            else:
+                df[col] = s.astype(object).fillna("")
+    return df
+
+def query_df(sql_stmt, params=None, file_db=FILE_DB, use_cache=True, fill=False):
+    """run a select statement and return DataFrame (see arrow_to_df), 
+    fill: NULLs filled by fill_blanks() for display
+
+    served from QUERY_CACHE unless a table it reads has been modified,
+    cached frames are shared by sessions, treat result as read-only (see QueryCache)
+    """
+    if use_cache and DB_SERVER_SOCKET and file_db == FILE_DB:
+        # pick up writes made by other app processes
+        QUERY_CACHE.sync_generations(get_db_client().generations())
+    holder = get_trace_context().get("session")
+    with profile_phase("sql") as rec:
+        if use_cache:
+            df = QUERY_CACHE.get(sql_stmt, params, fill=fill, holder=holder)
+            if df is not None:
+                if rec is not None:
+                    rec.update({"sql": fingerprint_sql(sql_stmt), "rows": len(df), "cached": True})
+                return df
+            gens = {t: QUERY_CACHE.generation(t) for t in sql_tables(sql_stmt)}
+        t = time.perf_counter()
+        table = fetch_arrow(sql_stmt, params, file_db=file_db)
+        trace_sql(sql_stmt, params, ms=(time.perf_counter() - t) * 1000, rows=table.num_rows)
+        if rec is not None:
+            rec.update({"sql": fingerprint_sql(sql_stmt), "rows": table.num_rows, "cached": False})
+    with profile_phase("to_df"):
+        df = arrow_to_df(table)
+    if use_cache:
+        QUERY_CACHE.put(sql_stmt, params, df, gens, holder=holder)
+        df = df.copy(deep=False)
+    return fill_blanks(df) if fill else df
+
+def create_index(index_name, table_name, cols, unique=False, file_db=FILE_DB):
+    """create index if not exists, return error message if failed
+    """
+    err_msg = ""
+    with DBConn(file_db) as _conn:
+        try:
+            sql_stmt = f"""
+                create {"unique" if unique else ""} index if not exists {index_name} 
+                on {table_name} ({", ".join(cols)});
+            """
+            _conn.execute(sql_stmt)
+        except Exception as ex:
+            err_msg = str(ex)
+    return err_msg
+
+def create_indexes(index_props=INDEX_PROPS, file_db=FILE_DB):
+    """create indexes in spec if missing, check existing ones against spec
+
+    Returns:
+        list of dict(table_name, index_name, status, err_msg), 
+        status: exists, created, mismatch (definition differs from spec), failed, skipped
+    """
+    report = []
+    with DBConn(file_db) as _conn:
+        tables = set([r[0] for r in _conn.execute(
+                "select table_name from information_schema.tables;").fetchall()])
+        existing = dict(_conn.execute(
+                "select index_name, sql from duckdb_indexes();").fetchall())
+
+    for table_name, indexes in index_props.items():
+        for index_name, props in indexes.items():
+            cols = props.get("columns", [])
+            unique = props.get("is_unique", False)
+            status, err_msg = "", ""
+            if table_name not in tables:
+                status = "skipped"
+            elif index_name in existing:
+                sql = (existing[index_name] or "").lower()
+                m = re.search(r"\((.*)\)", sql)
+                cols_db = [c.strip() for c in m.group(1).split(",")] if m else []
+                if cols_db == cols and ("unique" in sql) == unique:
+                    status = "exists"
+                else:
+                    status, err_msg = "mismatch", sql
+            else:
+                err_msg = create_index(index_name, table_name, cols, unique=unique, file_db=file_db)
+                status = "failed" if err_msg else "created"
+            report.append({"table_name": table_name, "index_name": index_name, 
+                           "status": status, "err_msg": err_msg})
+    return report
 
 def alter_table_add_column(table_name, col_name, col_type = "VARCHAR", file_db=FILE_DB):
     df_1, df_2, err_msg = None, None, ""
@@ -46,6 +758,7 @@ def alter_table_add_column(table_name, col_name, col_type = "VARCHAR", file_db=F
                     ALTER TABLE {table_name} add column {col_name} {col_type};
                 """
                 df_2 = _conn.execute(alter_sql).df()
+                QUERY_CACHE.bump(table_name)
     return df_1, df_2, err_msg
 
 def alter_table_drop_column(table_name, col_name, file_db=FILE_DB):
@@ -56,16 +769,439 @@ def alter_table_drop_column(table_name, col_name, file_db=FILE_DB):
                 ALTER TABLE {table_name} drop {col_name};
             """
             df = _conn.execute(alter_sql).df()
+            QUERY_CACHE.bump(table_name)
         except Exception as ex:
             err_msg = str(ex)
     return df, err_msg
 
+COLD_START = {}
+
+def record_cold_start(elapsed, budget=COLD_START_BUDGET_SEC):
+    """record duration (seconds) of first script run in this process,
+    warn if it exceeds budget
+    """
+    if COLD_START:
+        return
+    COLD_START.update({"elapsed": elapsed, "budget": budget, "over_budget": elapsed > budget})
+    if elapsed > budget:
+        print(f"[WARN] cold start took {elapsed:.2f} sec, budget {budget:.2f} sec")
+
+#######################################################
+#  Helper functions  - profiling
+#######################################################
+def fingerprint_sql(sql_stmt):
+    """SQL text with literals replaced by '?', 
+    statements differing only in values share one fingerprint
+    """
+    sql_stmt = normalize_sql(sql_stmt).lower()
+    sql_stmt = re.sub(r"'(?:[^']|'')*'", "?", sql_stmt)
+    sql_stmt = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql_stmt)
+    return sql_stmt
+
+class Profiler(object):
+    """timings of one script run, recorded by phase()
+
+    Each record: phase name, start offset and duration (ms), 
+    nesting depth and info dict (e.g. SQL fingerprint, rows)
+    """
+    def __init__(self, label=""):
+        self.label = label
+        self.t0 = time.perf_counter()
+        self.records = []
+        self.depth = 0
+
+    @contextmanager
+    def phase(self, name, **info):
+        rec = {"phase": name, "depth": self.depth, 
+               "start_ms": round((time.perf_counter() - self.t0) * 1000, 2)}
+        rec.update(info)
+        self.records.append(rec)
+        self.depth += 1
+        t = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["ms"] = round((time.perf_counter() - t) * 1000, 2)
+            self.depth -= 1
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.t0) * 1000, 2)
+
+    def summary(self):
+        """DataFrame of count and total ms per phase
+        """
+        df = pd.DataFrame(self.records, columns=["phase", "ms"])
+        if df.empty:
+            return df
+        return (df.groupby("phase")["ms"].agg(["count", "sum"])
+                    .rename(columns={"sum": "total_ms"})
+                    .sort_values("total_ms", ascending=False).reset_index())
+
+    def to_json(self):
+        return json.dumps({"label": self.label, "total_ms": self.elapsed_ms(), 
+                           "phases": self.records}, indent=2, default=str)
+
+_PROFILERS = threading.local()
+
+def start_profile(label=""):
+    """start profiling current script run (thread)
+    """
+    _PROFILERS.current = Profiler(label)
+    return _PROFILERS.current
+
+def stop_profile():
+    prof = getattr(_PROFILERS, "current", None)
+    _PROFILERS.current = None
+    return prof
+
+@contextmanager
+def profile_phase(name, **info):
+    """time a phase if profiling is on for current thread, 
+    yield record dict to add info (None when off)
+    """
+    prof = getattr(_PROFILERS, "current", None)
+    if prof is None:
+        yield None
+        return
+    with prof.phase(name, **info) as rec:
+        yield rec
+
+class BufferedLog(object):
+    """append-only text file, lines are buffered in memory 
+    and written by a background thread every flush_sec (and at exit)
+    """
+    def __init__(self, file_path, flush_sec=SQL_TRACE_FLUSH_SEC):
+        self.file_path = file_path
+        self.flush_sec = flush_sec
+        self._lines = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self, line):
+        with self._lock:
+            self._lines.append(line)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_sec):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+        if lines:
+            with open(self.file_path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+class SQLTrace(BufferedLog):
+    """SQL trace log, one JSON record per executed statement:
+        ts, fingerprint (hash of fingerprint_sql), sql (fingerprint text), 
+        kind (read/write), ms, rows, session, menu
+
+    Select statements slower than slow_ms are re-run with EXPLAIN ANALYZE
+    by the flush thread, the profile is logged as kind "explain".
+    """
+    def __init__(self, file_path=SQL_TRACE_FILE, slow_ms=SLOW_QUERY_MS, 
+                 explain_interval=SLOW_QUERY_EXPLAIN_INTERVAL_SEC, file_db=FILE_DB):
+        super().__init__(file_path)
+        self.slow_ms = slow_ms
+        self.explain_interval = explain_interval
+        self.file_db = file_db
+        self._slow = []         # (record, sql_stmt, params) waiting for EXPLAIN ANALYZE
+        self._explained = {}    # fingerprint -> time of last EXPLAIN ANALYZE
+
+    def record(self, sql_stmt, params=None, ms=0.0, rows=None, kind="read", context=None):
+        fp_sql = fingerprint_sql(sql_stmt)
+        rec = {"ts": str(datetime.now()), 
+               "fingerprint": hashlib.md5(fp_sql.encode("utf-8")).hexdigest()[:12],
+               "kind": kind, "ms": round(ms, 2), "rows": rows}
+        rec.update(context if context is not None else get_trace_context())
+        rec["sql"] = fp_sql
+        self.write(json.dumps(rec, default=str))
+        if kind == "read" and ms > self.slow_ms:
+            with self._lock:
+                last = self._explained.get(rec["fingerprint"], 0)
+                if time.time() - last > self.explain_interval:
+                    self._explained[rec["fingerprint"]] = time.time()
+                    self._slow.append((rec, sql_stmt, params))
+
+    def flush(self):
+        with self._lock:
+            slow, self._slow = self._slow, []
+        for rec, sql_stmt, params in slow:
+            try:
+                with DBConn(self.file_db) as _conn:
+                    plan = _conn.execute(f"explain analyze {sql_stmt}", params).fetchall()
+                profile = "\n".join([str(r[-1]) for r in plan])
+            except Exception as ex:
+                profile = f"[ERROR] {ex}"
+            self.write(json.dumps({"ts": str(datetime.now()), "fingerprint": rec["fingerprint"],
+                "kind": "explain", "ms": rec["ms"], "session": rec.get("session"), 
+                "menu": rec.get("menu"), "sql": rec["sql"], "profile": profile}))
+        super().flush()
+
+_TRACE_CONTEXT = threading.local()
+
+def set_trace_context(**context):
+    """tag statements of current thread (script run), e.g. session, menu
+    """
+    _TRACE_CONTEXT.context = context
+
+def get_trace_context():
+    return dict(getattr(_TRACE_CONTEXT, "context", {}))
+
+SQL_TRACE = SQLTrace() if SQL_TRACE_FILE else None
+
+def trace_sql(sql_stmt, params=None, ms=0.0, rows=None, kind="read", context=None):
+    if SQL_TRACE is not None:
+        SQL_TRACE.record(sql_stmt, params, ms=ms, rows=rows, kind=kind, context=context)
+
+_LOG_FILE = ".".join(__file__.split(".")[: -1]) + ".log"
+_LOG = BufferedLog(_LOG_FILE)
+
+@atexit.register
+def close_logs():
+    # registered after close_db_pools(), runs before it
+    if SQL_TRACE is not None:
+        SQL_TRACE.close()
+    _LOG.close()
+
+#######################################################
+#  Helper functions  - memory accounting
+#######################################################
+def read_rss_bytes():
+    """resident set size of this process, 
+    from /proc (Linux), else peak RSS from resource module
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+def obj_nbytes(obj, _depth=0):
+    """approx. bytes held by obj: DataFrames are measured deep, 
+    dicts/lists are walked for frames (other objects are not, 
+    their properties may compute frames, e.g. AgGridReturn)
+    """
+    import sys
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if _depth > 3:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum([obj_nbytes(v, _depth + 1) for v in obj.values()])
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum([obj_nbytes(v, _depth + 1) for v in obj])
+    return sys.getsizeof(obj)
+
+def session_state_sizes(state):
+    """list of dict(key, type, nbytes) of session_state items, largest first
+    """
+    sizes = []
+    for key in list(state.keys()):
+        try:
+            val = state[key]
+        except Exception:
+            continue
+        sizes.append({"key": str(key), "type": type(val).__name__, "nbytes": obj_nbytes(val)})
+    return sorted(sizes, key=lambda r: r["nbytes"], reverse=True)
+
+class MemoryTracker(object):
+    """process-wide memory accounting of script runs
+
+    rerun() measures RSS delta (and tracemalloc delta if tracing is on) 
+    of one script run, attributed to its session and menu item.
+    Frames held by the run (grid data, AgGrid response) are added by track_frame(),
+    session_state sizes by update_session().
+
+    Script runs of other sessions overlap in the same process,
+    deltas are therefore indicative; leaks show as steadily growing totals.
+    """
+    def __init__(self, budget_bytes=SESSION_MEMORY_BUDGET_MB * 1024 * 1024, 
+                 tracemalloc_on=MEMORY_TRACEMALLOC, session_ttl_sec=24 * 3600):
+        self.budget_bytes = budget_bytes
+        self.session_ttl_sec = session_ttl_sec
+        self.sessions = {}      # session id -> last run info and state sizes
+        self.menus = {}         # menu item -> totals over runs
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if tracemalloc_on:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @staticmethod
+    def _traced_bytes():
+        import tracemalloc
+        return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+    @contextmanager
+    def rerun(self, session_id, menu):
+        rec = {"session": session_id, "menu": menu, "frames": {}}
+        self._local.current = rec
+        rss, traced = read_rss_bytes(), self._traced_bytes()
+        try:
+            yield rec
+        finally:
+            self._local.current = None
+            rec["rss_delta"] = read_rss_bytes() - rss
+            traced_after = self._traced_bytes()
+            rec["py_delta"] = traced_after - traced if traced is not None and traced_after is not None else None
+            rec["frames_nbytes"] = sum(rec["frames"].values())
+            self._record(rec)
+
+    def track_frame(self, name, obj):
+        """count obj (DataFrame, grid response) as held by current run
+        """
+        rec = getattr(self._local, "current", None)
+        if rec is not None:
+            rec["frames"][name] = rec["frames"].get(name, 0) + obj_nbytes(obj)
+
+    def _record(self, rec):
+        now = time.time()
+        with self._lock:
+            sess = self.sessions.setdefault(rec["session"], {"reruns": 0, "state_nbytes": 0})
+            sess.update({"menu": rec["menu"], "updated": now, "rss_delta": rec["rss_delta"], 
+                         "py_delta": rec["py_delta"], "frames_nbytes": rec["frames_nbytes"]})
+            sess["reruns"] += 1
+            menu = self.menus.setdefault(rec["menu"], {"reruns": 0, "rss_delta": 0, 
+                                                       "py_delta": 0, "frames_nbytes": 0})
+            menu["reruns"] += 1
+            menu["rss_delta"] += rec["rss_delta"]
+            menu["py_delta"] += rec["py_delta"] or 0
+            menu["frames_nbytes"] = max(menu["frames_nbytes"], rec["frames_nbytes"])
+            for sid in [s for s, v in self.sessions.items() if now - v["updated"] > self.session_ttl_sec]:
+                self.sessions.pop(sid)
+
+    def update_session(self, session_id, state_sizes):
+        """record session_state sizes, return True if session is over budget
+        """
+        nbytes = sum([r["nbytes"] for r in state_sizes])
+        with self._lock:
+            sess = self.sessions.setdefault(session_id, {"reruns": 0, "updated": time.time()})
+            was_over = sess.get("over_budget", False)
+            sess["state_nbytes"] = nbytes
+            sess["over_budget"] = nbytes + sess.get("frames_nbytes", 0) > self.budget_bytes
+        if sess["over_budget"] and not was_over:
+            log_print(f"[WARN] session {session_id} holds {(nbytes + sess.get('frames_nbytes', 0)) / 2**20:.1f} MB, "
+                      f"budget {self.budget_bytes / 2**20:.0f} MB")
+        return sess["over_budget"]
+
+    def sessions_df(self):
+        with self._lock:
+            rows = [dict(v, session=k) for k, v in self.sessions.items()]
+        return pd.DataFrame(rows, columns=["session", "menu", "reruns", "state_nbytes", 
+                    "frames_nbytes", "rss_delta", "py_delta", "over_budget"])
+
+    def menus_df(self):
+        with self._lock:
+            rows = [dict(v, menu=k) for k, v in self.menus.items()]
+        return pd.DataFrame(rows, columns=["menu", "reruns", "rss_delta", "py_delta", "frames_nbytes"])
+
+MEMORY_TRACKER = MemoryTracker()
+
+#######################################################
+#  Helper functions  - column metadata
+#######################################################
+def gen_label(col):
+    "Convert table column into form label"
+    if col == 'ts_created': return "Created At"
+    if "_" not in col:
+        if col.upper() in ["URL","ID"]:
+            return col.upper()
+        elif col.upper() == "TS":
+            return "Timestamp"
+        return col.capitalize()
+
+    cols = []
+    for c in col.split("_"):
+        c  = c.strip()
+        if not c: continue
+        cols.append(c.capitalize())
+    return " ".join(cols)
+
+def _compile_table_props(col_props):
+    """compile COLUMN_PROPS of one table into read-only structures:
+        is_* props -> tuple of column names
+        other props -> mapping of column name to value
+        label_text -> label for every column with widget_type
+        all_columns -> columns with widget_type
+        col1_columns, col2_columns, col3_columns -> visible columns per form column
+        visible_set, editable_set, system_set -> frozenset for membership test
+    """
+    defs = {}
+    for p in PROPS:
+        if p.startswith("is_"):
+            defs[p] = tuple([k for k,v in col_props.items() if v.get(p, False)])
+        else:
+            defs[p] = {k: v[p] for k,v in col_props.items() if v.get(p, "")}
+
+    defs['label_text'] = {col: defs['label_text'].get(col) or gen_label(col) 
+                            for col in defs['widget_type'].keys()}
+    defs['all_columns'] = tuple(defs['widget_type'].keys())
+
+    # max number of form columns = 3
+    for i in range(1,4):
+        defs[f"col{i}_columns"] = tuple([c for c in defs['is_visible'] 
+                        if defs['form_column'].get(c, "").startswith(f"COL_{i}-")])
+
+    defs['visible_set'] = frozenset(defs['is_visible'])
+    defs['editable_set'] = frozenset(defs['is_editable'])
+    defs['system_set'] = frozenset(defs['is_system_col'])
+
+    return MappingProxyType({k: MappingProxyType(v) if isinstance(v, dict) else v 
+                                for k,v in defs.items()})
+
+def compile_column_props(column_props=COLUMN_PROPS):
+    """compile COLUMN_PROPS once per process (module import survives Streamlit reruns)
+    """
+    return MappingProxyType({table_name: _compile_table_props(col_props) 
+                                for table_name, col_props in column_props.items()})
+
+COLUMN_DEFS = compile_column_props()
+
+# columns entered by selectbox, loaded as category
+LOV_COLUMNS = frozenset([col for defs in COLUMN_DEFS.values() 
+                            for col, w in defs['widget_type'].items() if w == "selectbox"])
+
+def get_columns(table_name, prop_name="is_visible"):
+    """lookup compiled column metadata, e.g. tuple of visible columns
+    """
+    return COLUMN_DEFS[table_name][prop_name]
+
 #######################################################
 #  Helper functions  - Misc
 #######################################################
 
 def get_uid():
-    return os.getlogin()
+    """login name of current user, 
+    os.getlogin() fails without controlling terminal (service, container, CI)
+    """
+    try:
+        return os.getlogin()
+    except OSError:
+        import getpass
+        try:
+            return getpass.getuser()
+        except Exception:
+            return os.environ.get("USER") or os.environ.get("USERNAME") or ""
 
 # Function sourced from
 # https://stackoverflow.com/questions/312443/how-do-you-split-a-list-into-evenly-sized-chunks
@@ -89,11 +1225,10 @@ def list2sql_str(l):
 
 def log_print(msg):
     """print msg to console
-    log msg to __file__.log
+    log msg to __file__.log (buffered, see BufferedLog)
     """
     print(msg)
-    file_log= ".".join(__file__.split(".")[: -1]) + ".log"
-    open(file_log, 'a').write(f"{msg}\n")
+    _LOG.write(f"{msg}")
 
 # user function - regexp
 # https://benjr.tw/104785
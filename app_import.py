@@ -0,0 +1,390 @@
+"""
+Streaming bulk import of CSV/XLSX uploads
+
+An upload is read in bounded chunks (Arrow CSV reader, openpyxl read-only mode),
+each chunk is coerced to the columns of the target table in the database
+(all VARCHAR, incl. columns not shown in UI, see table_columns) and appended by one INSERT ... SELECT from the registered Arrow chunk,
+ids are generated by DuckDB (gen_random_uuid) for rows without one.
+Every chunk is committed by the writer thread (run_write) on its own,
+so that other sessions can write in between.
+Rows failing validate_chunk() or repeating a user key (name, url) of the table
+or of the upload are kept out and reported in a rejects CSV.
+
+Sheet (or CSV file name) selects target table, see IMPORT_SHEETS:
+    faculty          -> g_person (person_type = faculty)
+    research_groups  -> g_entity (entity_type = research_group, name <- research_group)
+    g_work or work   -> g_work (any table of COLUMN_PROPS)
+"""
+import csv
+import io
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+from app_config import *
+from app_helper import (DBConn, run_write, trace_sql, get_trace_context, get_uid, get_columns, 
+        QUERY_CACHE)
+
+# sheet key -> target table, renamed columns, constant columns
+IMPORT_SHEETS = {
+    "faculty": {"table_name": "g_person", "rename": {},
+                "const": {"person_type": "faculty"}},
+    "research_groups": {"table_name": "g_entity", "rename": {"research_group": "name"},
+                "const": {"entity_type": "research_group"}},
+}
+
+def sheet_key(name):
+    """sheet name or file name -> key of IMPORT_SHEETS, e.g. 'Research Groups' -> research_groups
+    """
+    return Path(name).stem.strip().lower().replace(" ", "_").replace("-", "_")
+
+def sheet_target(key):
+    """target spec of sheet key, None if sheet is not imported
+    """
+    if key in IMPORT_SHEETS:
+        return IMPORT_SHEETS[key]
+    for table_name in [key, f"g_{key}"]:
+        if table_name in COLUMN_PROPS:
+            return {"table_name": table_name, "rename": {}, "const": {}}
+    return None
+
+def _cell_str(val):
+    """openpyxl cell value -> str (None for blank)
+    """
+    if val is None:
+        return None
+    if isinstance(val, float) and val.is_integer():
+        return str(int(val))
+    if isinstance(val, (datetime, date)):
+        return val.isoformat()
+    return str(val)
+
+def iter_csv_chunks(file, chunk_bytes=IMPORT_CHUNK_BYTES):
+    """yield pyarrow Tables of string columns, about chunk_bytes of CSV each
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    file.seek(0)
+    header = file.readline().decode("utf-8-sig").strip()
+    file.seek(0)
+    if not header:
+        return
+    names = next(csv.reader([header]))
+    reader = pa_csv.open_csv(file,
+        read_options=pa_csv.ReadOptions(block_size=chunk_bytes, encoding="utf-8"),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in names}, strings_can_be_null=True))
+    for batch in reader:
+        if batch.num_rows:
+            yield pa.Table.from_batches([batch])
+
+def iter_xlsx_chunks(file, chunk_rows=IMPORT_CHUNK_ROWS, max_rows=None):
+    """yield (sheet name, pyarrow Table of string columns) of at most chunk_rows rows,
+    sheets are streamed by openpyxl read-only mode, 
+    max_rows: read only first rows of each sheet
+    """
+    import pyarrow as pa
+    from openpyxl import load_workbook
+    file.seek(0)
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True, 
+                                max_row=max_rows + 1 if max_rows else None)
+            header = next(rows, None)
+            if not header:
+                continue
+            names = [_cell_str(h) or f"column_{i}" for i, h in enumerate(header)]
+            buf = []
+            for row in rows:
+                buf.append(row)
+                if len(buf) >= chunk_rows:
+                    yield ws.title, _rows_to_table(names, buf)
+                    buf = []
+            if buf:
+                yield ws.title, _rows_to_table(names, buf)
+    finally:
+        wb.close()
+
+def _rows_to_table(names, rows):
+    import pyarrow as pa
+    cols = {}
+    for i, name in enumerate(names):
+        cols[name] = pa.array([_cell_str(r[i]) if i < len(r) else None for r in rows],
+                              type=pa.string())
+    return pa.table(cols)
+
+def iter_upload_chunks(file, filename, max_rows=None):
+    """yield (sheet key, pyarrow Table) of a CSV or XLSX upload,
+    max_rows: only first rows of each sheet (preview)
+    """
+    file_ext = filename.split(".")[-1].lower()
+    if file_ext == "csv":
+        key = sheet_key(filename)
+        for table in iter_csv_chunks(file):
+            yield key, (table.slice(0, max_rows) if max_rows else table)
+            if max_rows:
+                break
+    elif file_ext == "xlsx":
+        for sheet, table in iter_xlsx_chunks(file, 
+                chunk_rows=max_rows or IMPORT_CHUNK_ROWS, max_rows=max_rows):
+            yield sheet_key(sheet), table
+    else:
+        raise Exception(f"[ERROR] Unsupported file type: {filename}")
+
+def table_columns(table_name, file_db=FILE_DB):
+    """columns of table_name in database which an upload can fill (all but ts, uid),
+    may include columns not shown in UI (COLUMN_PROPS), e.g. phone, img_url of g_person
+    """
+    with DBConn(file_db) as _conn:
+        rows = _conn.execute("""
+            select column_name from information_schema.columns 
+            where table_name = ? order by ordinal_position;
+        """, [table_name]).fetchall()
+    if not rows:
+        raise Exception(f"[ERROR] Table not found: {table_name}")
+    return [r[0] for r in rows if r[0] not in ("ts", "uid")]
+
+def coerce_chunk(table, target, table_cols):
+    """columnar coercion of one chunk to target table columns (see table_columns):
+    header normalized and renamed, unknown columns dropped,
+    values cast to string and trimmed, blanks to NULL, constant columns set
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    cols = {}
+    for name, arr in zip(table.column_names, table.columns):
+        col = sheet_key(name)
+        col = target["rename"].get(col, col)
+        if col not in table_cols or col in cols:
+            continue
+        if not pa.types.is_string(arr.type):
+            if pa.types.is_floating(arr.type):
+                # integral floats (e.g. phd_year 1995.0) as integers
+                as_int = pc.cast(arr, pa.int64(), safe=False)
+                arr = pc.if_else(pc.equal(pc.cast(as_int, arr.type), arr),
+                                 pc.cast(as_int, pa.string()), pc.cast(arr, pa.string()))
+            else:
+                arr = pc.cast(arr, pa.string())
+        arr = pc.utf8_trim_whitespace(arr)
+        cols[col] = pc.if_else(pc.equal(arr, ""), pa.scalar(None, pa.string()), arr)
+    for col, val in target["const"].items():
+        cols[col] = pa.array([val] * table.num_rows, type=pa.string())
+    return pa.table(cols)
+
+def load_chunk(table_name, table, ts, uid, file_db=FILE_DB):
+    """append coerced chunk in one transaction, 
+    rows whose user key (name, url) exists in table_name or repeats within the chunk are kept out
+
+    Returns:
+        (number of rows loaded, mask of dropped rows, reasons of dropped rows)
+    """
+    import pyarrow as pa
+    view_name = f"v_import_{table_name}"
+    cols = [c for c in table.column_names if c != "id"]
+    id_expr = "coalesce(id, gen_random_uuid()::varchar)" if "id" in table.column_names \
+                else "gen_random_uuid()::varchar"
+    has_key = "name" in table.column_names and table_name != TABLE_RELATION
+    url_expr = "coalesce(url, '')" if "url" in table.column_names else "''"
+    table = table.append_column("_row", pa.array(range(table.num_rows), type=pa.int64()))
+    # first row of a user key in chunk is kept unless key already exists
+    dup_stmt = f"""
+        select _row, case when _rn > 1 then 'duplicate (name, url) in upload'
+                          else 'duplicate of existing (name, url)' end as reason
+        from (
+            select _row, name, {url_expr} as _url,
+                row_number() over (partition by name, {url_expr} order by _row) as _rn
+            from {view_name}
+        ) v
+        where _rn > 1 
+            or exists (select 1 from {table_name} t 
+                where t.name = v.name and coalesce(t.url, '') = v._url)
+        order by _row;
+    """
+    sql_stmt = f"""
+        insert into {table_name} (id, {", ".join(cols)}, ts, uid)
+        select {id_expr}, {", ".join(cols)}, ?, ?
+        from {view_name}
+        where _row not in (select unnest(?::bigint[]));
+    """
+    context = get_trace_context()
+    def _load(_conn):
+        _conn.register(view_name, table)
+        try:
+            dups = []
+            if has_key:
+                t = time.perf_counter()
+                dups = _conn.execute(dup_stmt).fetchall()
+                trace_sql(dup_stmt, ms=(time.perf_counter() - t) * 1000, rows=len(dups),
+                          kind="read", context=context)
+            t = time.perf_counter()
+            _conn.execute(sql_stmt, [ts, uid, [r[0] for r in dups]])
+            trace_sql(sql_stmt, ms=(time.perf_counter() - t) * 1000, rows=table.num_rows - len(dups),
+                      kind="write", context=context)
+        finally:
+            _conn.unregister(view_name)
+        return dups
+    try:
+        dups = run_write(_load, file_db=file_db)
+    finally:
+        QUERY_CACHE.bump(table_name)
+    dropped = [False] * table.num_rows
+    for row, _ in dups:
+        dropped[row] = True
+    return table.num_rows - len(dups), pa.array(dropped), [r[1] for r in dups]
+
+def validate_chunk(table, table_name):
+    """columnar checks of a coerced chunk:
+        required columns (is_required, except system columns) not blank
+        LOV columns (LOV_OPTIONS) in list of values
+        URL columns start with http(s)://, email columns look like name@host.domain
+        phd_year is a year in IMPORT_PHD_YEAR_RANGE
+
+    Returns:
+        (valid rows, mask of rejected rows, reasons of rejected rows),
+        reasons are built only for rejected rows
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    checks = []     # (reason, bool mask of invalid rows)
+    system_cols = get_columns(table_name, "system_set")
+    for col in get_columns(table_name, "is_required"):
+        if col in system_cols:
+            continue
+        if col not in table.column_names:
+            checks.append((f"missing {col}", pa.array([True] * table.num_rows)))
+        else:
+            checks.append((f"missing {col}", pc.is_null(table[col])))
+    for col, lov in LOV_OPTIONS.items():
+        if col in table.column_names:
+            values = pa.array([v for v in lov if v], type=pa.string())
+            checks.append((f"invalid {col}", pc.and_(pc.is_valid(table[col]),
+                           pc.invert(pc.is_in(table[col], value_set=values)))))
+    for cols, pattern in [
+            (IMPORT_URL_COLUMNS, r"^https?://\S+$"),
+            (IMPORT_EMAIL_COLUMNS, r"^[^@\s]+@[^@\s]+\.[^@\s]+$"),
+        ]:
+        for col in [c for c in cols if c in table.column_names]:
+            checks.append((f"invalid {col}", pc.invert(pc.match_substring_regex(table[col], pattern))))
+    if "phd_year" in table.column_names:
+        year = table["phd_year"]
+        is_year = pc.match_substring_regex(year, r"^\d{4}$")
+        year_num = pc.cast(pc.if_else(is_year, year, pa.scalar(None, pa.string())), pa.int32())
+        in_range = pc.and_(pc.greater_equal(year_num, IMPORT_PHD_YEAR_RANGE[0]), 
+                           pc.less_equal(year_num, IMPORT_PHD_YEAR_RANGE[1]))
+        # blank phd_year is not checked, any other value must be a year in range
+        checks.append(("invalid phd_year", pc.and_(pc.is_valid(year), 
+                       pc.invert(pc.fill_null(in_range, False)))))
+
+    # NULL means not checked (blank value), not invalid
+    masks = [pc.fill_null(mask, False) for _, mask in checks]
+    masks = [m.combine_chunks() if isinstance(m, pa.ChunkedArray) else m for m in masks]
+    rejected = pa.array([False] * table.num_rows)
+    for mask in masks:
+        rejected = pc.or_(rejected, mask)
+    if not pc.any(rejected).as_py():
+        return table, rejected, []
+    flags = [mask.filter(rejected).to_pylist() for mask in masks]
+    reasons = ["; ".join([checks[i][0] for i, f in enumerate(row) if f]) for row in zip(*flags)]
+    return table.filter(pc.invert(rejected)), rejected, reasons
+
+class RejectsWriter(object):
+    """CSV of rejected rows (source row number, reason, coerced values),
+    one file per sheet, written chunk by chunk
+    """
+    def __init__(self):
+        self.files = {}     # sheet key -> (BytesIO, pyarrow CSVWriter, schema)
+        self.counts = {}
+
+    def write(self, key, table, rejected, reasons, row_offset, positions=None):
+        """positions: row of each table row in chunk, default: 0, 1, ...
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pa_csv
+        if positions is None:
+            positions = pa.array(range(table.num_rows), type=pa.int64())
+        # row number in sheet/CSV, header is row 1
+        rows = pc.add(positions, row_offset + 2).filter(rejected)
+        out = table.filter(rejected)
+        out = out.add_column(0, "reject_reason", pa.array(reasons, type=pa.string()))
+        out = out.add_column(0, "row", rows)
+        if key not in self.files:
+            buf = io.BytesIO()
+            self.files[key] = (buf, pa_csv.CSVWriter(buf, out.schema), out.schema)
+            self.counts[key] = 0
+        buf, writer, schema = self.files[key]
+        writer.write_table(out.select(schema.names).cast(schema))
+        self.counts[key] += out.num_rows
+
+    def to_bytes(self):
+        """dict of sheet key -> CSV bytes
+        """
+        result = {}
+        for key, (buf, writer, _) in self.files.items():
+            writer.close()
+            result[key] = buf.getvalue()
+        self.files.clear()
+        return result
+
+def import_upload(file, filename, progress=None, file_db=FILE_DB):
+    """stream upload into database chunk by chunk, 
+    rows failing validate_chunk() or duplicating a user key (see load_chunk) 
+    are not loaded but written to rejects CSV
+
+    Inputs:
+        progress: optional callback(sheet key, table_name, rows loaded so far)
+
+    Returns:
+        (report, rejects):
+        report: dict of sheet key -> dict(table_name, rows, rejected, chunks, validate_ms, ms),
+            table_name is "" for skipped sheets
+        rejects: dict of sheet key -> CSV bytes of rejected rows with reason
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    ts, uid = str(datetime.now()), get_uid()
+    report = {}
+    table_cols = {}     # sheet key -> columns of target table
+    rejects = RejectsWriter()
+    for key, table in iter_upload_chunks(file, filename):
+        target = sheet_target(key)
+        rep = report.setdefault(key, {"table_name": target["table_name"] if target else "",
+                            "rows": 0, "rejected": 0, "chunks": 0, "validate_ms": 0.0, "ms": 0.0})
+        if target is None:
+            continue
+        t = time.perf_counter()
+        table_name = target["table_name"]
+        if key not in table_cols:
+            table_cols[key] = table_columns(table_name, file_db=file_db)
+        chunk = coerce_chunk(table, target, table_cols[key])
+        t_valid = time.perf_counter()
+        valid, rejected, reasons = validate_chunk(chunk, table_name)
+        rep["validate_ms"] += (time.perf_counter() - t_valid) * 1000
+        row_offset = rep["rows"] + rep["rejected"]
+        if reasons:
+            rejects.write(key, chunk, rejected, reasons, row_offset=row_offset)
+            rep["rejected"] += len(reasons)
+        if valid.num_rows:
+            num_rows, dropped, dup_reasons = load_chunk(table_name, valid, ts, uid, file_db=file_db)
+            rep["rows"] += num_rows
+            if dup_reasons:
+                positions = pa.array(range(chunk.num_rows), type=pa.int64()).filter(pc.invert(rejected))
+                rejects.write(key, valid, dropped, dup_reasons, row_offset=row_offset, positions=positions)
+                rep["rejected"] += len(dup_reasons)
+        rep["chunks"] += 1
+        rep["ms"] += (time.perf_counter() - t) * 1000
+        if progress:
+            progress(key, table_name, rep["rows"])
+    for rep in report.values():
+        rep["ms"] = round(rep["ms"], 1)
+        rep["validate_ms"] = round(rep["validate_ms"], 1)
+    return report, rejects.to_bytes()
+
+def preview_upload(file, filename, max_rows=IMPORT_PREVIEW_ROWS):
+    """dict of sheet key -> DataFrame of first rows of each sheet
+    """
+    previews = {key: table.to_pandas() 
+                for key, table in iter_upload_chunks(file, filename, max_rows=max_rows)}
+    file.seek(0)
+    return previews
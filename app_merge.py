@@ -0,0 +1,282 @@
+"""
+Merge another csinfo database (e.g. a colleague's copy) into this one
+
+The other database is ATTACHed read-only and every g_* table present in both
+is diffed in set-based SQL run by DuckDB on temp tables:
+    1. match: their row matches my row by id, else by user key
+       ((name, url), or relation columns of g_relation)
+    2. classify (data columns, blank = no value):
+        new         no matching row, inserted (their id, ts, uid kept)
+        same        nothing to take from their row (equal or blank values)
+        changed     their values fill blanks of my row
+        conflict    both sides have different values in a column, resolved by
+                    MERGE_RESOLUTIONS: newest (row ts) wins, mine wins, theirs wins
+        duplicate   my row is already matched by another of their rows, skipped
+    3. references (ref_tab/ref_key/ref_val, ref_*_sub of g_relation) in their rows
+       are remapped to my id/name/url before ref tables are diffed,
+       so that their relations to a matched row point to my row
+
+merge_databases() applies all tables in one transaction, diff_databases() only reports.
+
+Usage:
+    python app_merge.py --other colleague.duckdb [--file-db cs-faculty.duckdb]
+                        [--resolution newest|mine|theirs] [--apply]
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from app_config import *
+from app_helper import DBConn, run_write, get_uid, QUERY_CACHE, log_print
+from app_dedup import ref_tables
+
+STATUSES = ["new", "same", "changed", "conflict", "duplicate"]
+TEMP_TABLES = ["mg_theirs", "mg_match", "mg_diff", "mg_pairs", "mg_keymap"]
+
+def user_key(table_name):
+    """columns identifying a row besides id"""
+    if table_name == TABLE_RELATION:
+        return ["rel_type", "ref_tab", "ref_key", "ref_val", "ref_tab_sub", "ref_key_sub", "ref_val_sub"]
+    return ["name", "url"]
+
+def update_cols(table_name, cols):
+    """data columns of table_name which are merged into my rows (all but system columns),
+    indexed columns included: no unique index (see INDEX_PROPS) fails their update
+    """
+    return [c for c in cols if c not in SYS_COLS]
+
+def _table_cols(_conn, table_name):
+    return [d[0] for d in _conn.execute(f"select * from {table_name} limit 0").description]
+
+def merge_tables(_conn, alias):
+    """g_* tables in both databases, tables holding references last
+    """
+    theirs = set([r[0] for r in _conn.execute(
+        "select table_name from duckdb_tables() where database_name = ?", [alias]).fetchall()])
+    refs = ref_tables()
+    tables = [t for t in COLUMN_PROPS.keys() if t in theirs]
+    return [t for t in tables if t not in refs] + [t for t in tables if t in refs]
+
+def _diff_table(_conn, alias, table_name, resolution):
+    """create temp tables mg_theirs (their rows not in my table, references remapped),
+    mg_match and mg_diff (status per their row), return counts by status
+    """
+    cols = _table_cols(_conn, table_name)
+    their_cols = set(_table_cols(_conn, f"{alias}.{table_name}"))
+    data_cols = update_cols(table_name, cols)
+    select_cols, joins = [], []
+    for c in cols:
+        select_cols.append(f"t.{c}" if c in their_cols else f"NULL::varchar as {c}")
+    for s in ref_tables().get(table_name, []):
+        if not all([f"ref_{c}{s}" in their_cols for c in ["tab", "key", "val"]]):
+            continue
+        select_cols[cols.index(f"ref_val{s}")] = f"coalesce(k{s}.new_val, t.ref_val{s}) as ref_val{s}"
+        joins.append(f"""left join mg_keymap k{s} on k{s}.tab = t.ref_tab{s}
+            and k{s}.key = t.ref_key{s} and k{s}.old_val = t.ref_val{s}""")
+    select_cols[cols.index("id")] = "coalesce(nullif(t.id, ''), gen_random_uuid()::varchar) as id"
+    # rows equal in both databases need no matching, usually most of them
+    _conn.execute(f"""
+        create or replace temp table mg_theirs as
+        select {", ".join(select_cols)}
+        from {alias}.{table_name} t {" ".join(joins)}
+        except
+        select {", ".join(cols)} from {table_name};
+    """)
+    num_rows = _conn.execute(f"select count(*) from {alias}.{table_name}").fetchone()[0]
+
+    key_match = " and ".join([f"coalesce(t.{c}, '') = coalesce(m.{c}, '')" for c in user_key(table_name)])
+    _conn.execute(f"""
+        create or replace temp table mg_match as
+        with by_id as (
+            select t.id as their_id, m.id as my_id, 'id' as how
+            from mg_theirs t join {table_name} m on m.id = t.id
+        )
+        select their_id, my_id, how,
+            row_number() over (partition by my_id order by how, their_id) > 1 as is_dup
+        from (
+            select their_id, my_id, how from by_id
+            union all
+            -- user key only for rows without id match, most rows of shared data match by id
+            select t.id, m.id, 'key'
+            from (select * from mg_theirs where id not in (select their_id from by_id)) t
+            join {table_name} m on {key_match}
+            qualify row_number() over (partition by t.id order by m.id) = 1
+        ) c;
+    """)
+
+    same = " and ".join([f"coalesce(t.{c}, '') in ('', coalesce(m.{c}, ''))" for c in data_cols] or ["true"])
+    conflict = [f"(coalesce(t.{c}, '') <> '' and coalesce(m.{c}, '') <> '' and t.{c} <> m.{c})"
+                for c in data_cols]
+    diff_cols = ", ".join([f"case when {expr} then '{c}' end" for c, expr in zip(data_cols, conflict)])
+    pick_theirs = {"theirs": "true", "mine": "false",
+                   "newest": "coalesce(t.ts, '') > coalesce(m.ts, '')"}[resolution]
+    _conn.execute(f"""
+        create or replace temp table mg_diff as
+        select t.id as their_id, x.my_id,
+            case when x.my_id is null then 'new'
+                when x.is_dup then 'duplicate'
+                when {same} then 'same'
+                when {" or ".join(conflict) or "false"} then 'conflict'
+                else 'changed' end as status,
+            {pick_theirs} as pick_theirs,
+            {f"concat_ws(',', {diff_cols})" if diff_cols else "''"} as diff_cols
+        from mg_theirs t
+        left join mg_match x on x.their_id = t.id
+        left join {table_name} m on m.id = x.my_id;
+    """)
+    counts = dict(_conn.execute("select status, count(*) from mg_diff group by status").fetchall())
+    counts["same"] = counts.get("same", 0) + num_rows - sum(counts.values())
+    return {s: counts.get(s, 0) for s in STATUSES}
+
+def _apply_table(_conn, table_name, ts, uid):
+    """insert new rows, fill/resolve changed and conflicting rows (mg_diff),
+    return (rows inserted, rows updated)
+    """
+    cols = _table_cols(_conn, table_name)
+    data_cols = update_cols(table_name, cols)
+    inserted = _conn.execute(f"""
+        insert into {table_name} ({", ".join(cols)})
+        select {", ".join([f"t.{c}" for c in cols])}
+        from mg_theirs t join mg_diff d on d.their_id = t.id
+        where d.status = 'new';
+    """).fetchone()[0]
+    if not data_cols:
+        return inserted, 0
+    set_clause = ", ".join([f"""{c} = case when coalesce({table_name}.{c}, '') = '' then u.{c}
+            when coalesce(u.{c}, '') = '' then {table_name}.{c}
+            when u.pick_theirs then u.{c} else {table_name}.{c} end""" for c in data_cols])
+    changes = " or ".join([f"""(coalesce(u.{c}, '') <> '' and coalesce({table_name}.{c}, '') <> u.{c}
+            and (u.pick_theirs or coalesce({table_name}.{c}, '') = ''))""" for c in data_cols])
+    updated = _conn.execute(f"""
+        update {table_name} set {set_clause}, ts = ?, uid = ?
+        from (
+            select d.my_id, d.pick_theirs, {", ".join([f"t.{c}" for c in data_cols])}
+            from mg_diff d join mg_theirs t on t.id = d.their_id
+            where d.status in ('changed', 'conflict')
+        ) u
+        where {table_name}.id = u.my_id and ({changes});
+    """, [ts, uid]).fetchone()[0]
+    return inserted, updated
+
+def _update_keymap(_conn, table_name):
+    """map their id/name/url of matched rows to mine, for references in later tables
+    """
+    keys = [k for k in ["id", "name", "url"] if k in _table_cols(_conn, table_name)]
+    # pairs first: inequality of columns from two joined tables would be a nested loop join
+    _conn.execute(f"""
+        create or replace temp table mg_pairs as
+        select {", ".join([f"t.{k} as their_{k}, m.{k} as my_{k}" for k in keys])}
+        from mg_match x
+        join mg_theirs t on t.id = x.their_id
+        join {table_name} m on m.id = x.my_id;
+    """)
+    for key in keys:
+        _conn.execute(f"""
+            insert into mg_keymap
+            select '{table_name}', '{key}', their_{key}, min(my_{key})
+            from mg_pairs
+            where coalesce(their_{key}, '') <> '' and their_{key} <> coalesce(my_{key}, '')
+            group by their_{key};
+        """)
+
+def _merge(_conn, other_db, resolution, apply=False, limit=100):
+    """diff (and apply) all tables, see diff_databases()
+    """
+    if resolution not in MERGE_RESOLUTIONS:
+        raise Exception(f"[ERROR] Unknown resolution {resolution}, use one of {MERGE_RESOLUTIONS}")
+    # ATTACH is visible to all connections of the database, one alias per call
+    alias = f"mg_{uuid4().hex[:8]}"
+    other_path = str(other_db).replace("'", "''")
+    _conn.execute(f"attach '{other_path}' as {alias} (read_only);")
+    ts, uid = (str(datetime.now()), get_uid()) if apply else (None, None)
+    report, conflicts = [], []
+    try:
+        _conn.execute("""
+            create or replace temp table mg_keymap (
+                tab varchar, key varchar, old_val varchar, new_val varchar);
+        """)
+        for table_name in merge_tables(_conn, alias):
+            t = time.perf_counter()
+            counts = _diff_table(_conn, alias, table_name, resolution)
+            cols = _table_cols(_conn, table_name)
+            name = "m.name" if "name" in cols else "concat_ws(' ', m.rel_type, m.ref_val, m.ref_val_sub)"
+            url = "m.url" if "url" in cols else "NULL"
+            conflicts.append(_conn.execute(f"""
+                select '{table_name}' as table_name, d.my_id, d.their_id, d.diff_cols,
+                    {name} as name, {url} as url, m.ts as my_ts, t.ts as their_ts, d.pick_theirs
+                from mg_diff d
+                join mg_theirs t on t.id = d.their_id
+                join {table_name} m on m.id = d.my_id
+                where d.status = 'conflict'
+                limit {int(limit)};
+            """).df())
+            inserted = updated = 0
+            if apply:
+                inserted, updated = _apply_table(_conn, table_name, ts, uid)
+            _update_keymap(_conn, table_name)
+            report.append(dict(table_name=table_name, theirs=sum(counts.values()), **counts,
+                               inserted=inserted, updated=updated,
+                               ms=round((time.perf_counter() - t) * 1000, 1)))
+    finally:
+        for t in TEMP_TABLES:
+            _conn.execute(f"drop table if exists {t};")
+        _conn.execute(f"detach {alias};")
+    import pandas as pd
+    return pd.DataFrame(report), pd.concat(conflicts, ignore_index=True) if conflicts else pd.DataFrame()
+
+def _check_other(other_db, file_db):
+    if not os.path.exists(other_db):
+        raise Exception(f"[ERROR] Database file not found: {other_db}")
+    if os.path.exists(file_db) and os.path.samefile(other_db, file_db):
+        raise Exception(f"[ERROR] Cannot merge {file_db} into itself")
+
+def diff_databases(other_db, resolution=MERGE_RESOLUTIONS[0], file_db=FILE_DB, limit=100):
+    """diff all g_* tables of other_db against file_db, nothing is written
+
+    Returns:
+        (report, conflicts):
+        report: DataFrame per table of theirs (rows), new, same, changed, conflict, duplicate,
+            inserted, updated (0), ms
+        conflicts: DataFrame of up to limit conflicting rows per table: table_name, my_id, their_id,
+            diff_cols, name, url, my_ts, their_ts, pick_theirs (resolution takes their values)
+    """
+    _check_other(other_db, file_db)
+    with DBConn(file_db) as _conn:
+        return _merge(_conn, other_db, resolution, apply=False, limit=limit)
+
+def merge_databases(other_db, resolution=MERGE_RESOLUTIONS[0], file_db=FILE_DB, limit=100):
+    """merge all g_* tables of other_db into file_db in one transaction,
+    return (report, conflicts) as diff_databases() with rows inserted/updated
+    """
+    _check_other(other_db, file_db)
+    report = None
+    try:
+        report, conflicts = run_write(
+            lambda _conn: _merge(_conn, other_db, resolution, apply=True, limit=limit), file_db=file_db)
+    finally:
+        touched = COLUMN_PROPS.keys() if report is None else report["table_name"].to_list()
+        QUERY_CACHE.bump(*touched)
+    return report, conflicts
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge another csinfo database into this one")
+    parser.add_argument("--other", required=True, help="database to merge from (read only)")
+    parser.add_argument("--file-db", default=FILE_DB)
+    parser.add_argument("--resolution", default=MERGE_RESOLUTIONS[0], choices=MERGE_RESOLUTIONS,
+                        help="conflicting values: newest (row ts), mine or theirs win")
+    parser.add_argument("--apply", action="store_true", help="write merge, otherwise only report")
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    fn = merge_databases if args.apply else diff_databases
+    report, conflicts = fn(args.other, resolution=args.resolution, file_db=args.file_db)
+    print(report.to_string(index=False))
+    if not conflicts.empty:
+        print(conflicts.head(30).to_string(index=False))
+    log_print(f"{'merged' if args.apply else 'diffed'} {args.other} into {args.file_db} "
+              f"({args.resolution} wins) in {time.perf_counter() - t:.1f} sec")
+
+if __name__ == "__main__":
+    main()
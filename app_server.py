@@ -0,0 +1,128 @@
+"""
+Database server owning the DuckDB file, shared by several app processes
+
+DuckDB allows only one read-write process per database file,
+run this server once and set DB_SERVER_SOCKET in app_config.py
+so that every Streamlit process connects as a client (app_helper.DBClient).
+
+Protocol: each message is a JSON header and a binary body,
+both prefixed by 4-byte big-endian length (see app_helper.send_msg).
+Query results are returned as Arrow IPC stream in the body.
+
+Usage:
+    python app_server.py [--file-db cs-faculty.duckdb] [--socket /tmp/csinfo-db.sock]
+"""
+import argparse
+import os
+import signal
+import socketserver
+import sys
+
+import app_helper
+from app_helper import (send_msg, recv_msg, arrow_to_bytes, arrow_from_bytes,
+        get_db_pool, execute_write, sql_tables, QUERY_CACHE)
+from app_config import FILE_DB
+
+DEFAULT_SOCKET = "/tmp/csinfo-db.sock"
+
+# statements not changing data, generations are not bumped for them
+READ_ONLY_PREFIXES = ("select", "with", "pragma", "describe", "show", "explain")
+
+def is_write(sql_stmt):
+    return not sql_stmt.lstrip().lower().startswith(READ_ONLY_PREFIXES)
+
+class DBRequestHandler(socketserver.BaseRequestHandler):
+    """one handler thread (and one DuckDB cursor) per client connection
+    """
+    def handle(self):
+        cur = self.server.pool.cursor()
+        touched = set()     # tables written inside open transaction
+        while True:
+            try:
+                header, body = recv_msg(self.request)
+            except (EOFError, OSError):
+                break
+            try:
+                resp, out = self.dispatch(cur, header, body, touched)
+            except Exception as e:
+                resp, out = {"error": str(e)}, b""
+            try:
+                send_msg(self.request, resp, out)
+            except OSError:
+                break
+        if touched:
+            # client gone inside transaction
+            try:
+                cur.rollback()
+            except Exception:
+                pass
+
+    def dispatch(self, cur, header, body, touched):
+        op = header.get("op")
+        if op == "execute":
+            sql_stmt = header["sql"]
+            cur.execute(sql_stmt, header.get("params") or [])
+            if is_write(sql_stmt):
+                tables = sql_tables(sql_stmt)
+                touched.update(tables)
+                QUERY_CACHE.bump(*tables)
+            result = cur.arrow() if cur.description else None
+            return {}, (arrow_to_bytes(result) if result is not None else b"")
+        if op == "write":
+            statements = [(s, p) for s, p in header["statements"]]
+            try:
+                execute_write(statements, file_db=self.server.file_db)
+            finally:
+                QUERY_CACHE.bump(*[t for s, _ in statements for t in sql_tables(s)])
+            return {}, b""
+        if op == "generations":
+            return {"generations": QUERY_CACHE.generations()}, b""
+        if op == "register":
+            cur.register(header["name"], arrow_from_bytes(body))
+            return {}, b""
+        if op == "unregister":
+            cur.unregister(header["name"])
+            return {}, b""
+        if op == "begin":
+            cur.begin()
+            return {}, b""
+        if op in ("commit", "rollback"):
+            getattr(cur, op)()
+            # bump again so that readers caching during transaction see the result
+            QUERY_CACHE.bump(*touched)
+            touched.clear()
+            return {}, b""
+        raise Exception(f"Unknown op: {op}")
+
+class DBServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, file_db=FILE_DB):
+        self.file_db = file_db
+        self.pool = get_db_pool(file_db)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, DBRequestHandler)
+
+def main():
+    parser = argparse.ArgumentParser(description="CS Faculty database server")
+    parser.add_argument("--file-db", default=FILE_DB)
+    parser.add_argument("--socket", default=app_helper.DB_SERVER_SOCKET or DEFAULT_SOCKET)
+    args = parser.parse_args()
+
+    # this process owns the file, never act as client of itself
+    app_helper.DB_SERVER_SOCKET = ""
+    server = DBServer(args.socket, file_db=args.file_db)
+    # shut down cleanly on kill so that atexit checkpoints the database
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"serving {args.file_db} on {args.socket}")
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark database paths of app.py on a generated database (see gen_data.py)
+
+Each case calls the same backend function the UI calls:
+    org_lov          _db_select_org_list()            sidebar org filter
+    child_inter      _db_select_children_inter()      Faculty > Work/Team child grid
+    select_by_id     _db_select_by_id()
+    upsert_insert    _db_upsert() of new row
+    upsert_update    _db_upsert() of existing (name, url)
+    update_by_id     _db_update_by_id() with row held by grid
+    upsert_many      _db_upsert_many() of UPSERT_MANY_BATCH rows
+    export_csv       export_table() COPY to CSV file, as Import/Export page
+
+QUERY_CACHE is cleared before each read so that timings are database timings.
+Results (ms: min, p50, p95, max, mean per case) are written as JSON.
+
+Usage:
+    python gen_data.py --file-db bench.duckdb --rows 1000000
+    python bench_db.py --file-db bench.duckdb [--repeat 20] [--out bench_db.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import app_config
+
+UPSERT_MANY_BATCH = 1000
+# persons used by child_inter: most linked ones first, then random ones
+NUM_PERSONS = 10
+
+def percentile(values, pct):
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[k]
+
+def stats(values_ms):
+    return {
+        "n": len(values_ms),
+        "min": round(min(values_ms), 3),
+        "p50": round(percentile(values_ms, 50), 3),
+        "p95": round(percentile(values_ms, 95), 3),
+        "max": round(max(values_ms), 3),
+        "mean": round(statistics.mean(values_ms), 3),
+    }
+
+def run_case(fn, repeat, setup=None):
+    """call setup(i) (untimed) and fn(i) repeat times, return list of ms
+    """
+    timings = []
+    for i in range(repeat):
+        if setup:
+            setup(i)
+        t = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - t) * 1000)
+    return timings
+
+def run_benchmarks(repeat=20):
+    """run all cases against app_config.FILE_DB, return dict of results
+    """
+    import app
+    from app_helper import QUERY_CACHE, query_df, fill_blanks
+    from app_export import export_table
+
+    clear = lambda i: QUERY_CACHE.clear()
+    app._db_create_indexes()
+
+    counts = {t: int(query_df(f"select count(*) as n from {t}", use_cache=False)["n"][0])
+                for t in app_config.COLUMN_PROPS}
+    persons = query_df(f"""
+        select ref_val as url, count(*) as n
+        from g_relation where rel_type = 'person-work'
+        group by ref_val order by n desc limit {NUM_PERSONS // 2};
+    """, use_cache=False)["url"].to_list()
+    persons += query_df(f"""
+        select url from g_person using sample {NUM_PERSONS - len(persons)} rows;
+    """, use_cache=False)["url"].to_list()
+    people = fill_blanks(query_df("select * from g_person using sample 1000 rows;",
+                use_cache=False)).to_dict('records')
+    run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+
+    cases = {}
+    cases["org_lov"] = run_case(lambda i: app._db_select_org_list(), repeat, setup=clear)
+    cases["child_inter"] = run_case(lambda i: app._db_select_children_inter(
+            "g_work", "g_person", "url", persons[i % len(persons)], rel_type="person-work"),
+            repeat, setup=clear)
+    cases["select_by_id"] = run_case(lambda i: app._db_select_by_id(
+            "g_person", people[i % len(people)]["id"]), repeat, setup=clear)
+    cases["upsert_insert"] = run_case(lambda i: app._db_upsert({"table_name": "g_note",
+            "id": f"bench-{run_id}-{i}", "name": f"bench note {run_id} {i}", "url": "",
+            "note": "inserted by bench_db", "ts": str(datetime.now()), "uid": "bench"}), repeat)
+    cases["upsert_update"] = run_case(lambda i: app._db_upsert({"table_name": "g_note",
+            "name": f"bench note {run_id} {i}", "url": "",
+            "note": "updated by bench_db", "ts": str(datetime.now()), "uid": "bench"}), repeat)
+
+    # one sampled row per round, so that ts held by "grid" is current
+    cases["update_by_id"] = run_case(lambda i: app._db_update_by_id(
+            dict(people[i], table_name="g_person", note=f"bench {run_id} {i}"), 
+            old_row=people[i]), min(repeat, len(people)))
+    cases["upsert_many"] = run_case(lambda i: app._db_upsert_many("g_work",
+            [{"name": f"bench work {run_id} {j}", "url": f"https://bench/{j}",
+              "note": f"round {i}"} for j in range(UPSERT_MANY_BATCH)], debug=False),
+            max(1, repeat // 4))
+    def _export_csv(i):
+        os.remove(export_table("g_person", fmt="CSV")["path"])
+    cases["export_csv"] = run_case(_export_csv, max(1, repeat // 4))
+
+    return {
+        "run_at": str(datetime.now()),
+        "file_db": app_config.FILE_DB,
+        "python": platform.python_version(),
+        "rows": counts,
+        "cases": {name: stats(ms) for name, ms in cases.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database paths of app.py")
+    parser.add_argument("--file-db", required=True, help="database generated by gen_data.py")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", default="bench_db.json")
+    parser.add_argument("--in-place", action="store_true",
+                        help="write to --file-db instead of a temporary copy")
+    args = parser.parse_args()
+
+    file_db = args.file_db
+    tmp_dir = None
+    if not args.in_place:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_db_")
+        file_db = os.path.join(tmp_dir, os.path.basename(args.file_db))
+        shutil.copy(args.file_db, file_db)
+    # must be set before app/app_helper are imported (default arguments)
+    app_config.FILE_DB = file_db
+    try:
+        results = run_benchmarks(repeat=args.repeat)
+    finally:
+        if tmp_dir:
+            from app_helper import close_db_pools
+            close_db_pools()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    results["file_db"] = args.file_db
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    for name, s in results["cases"].items():
+        print(f"{name:16s} p50 {s['p50']:10.2f} ms   p95 {s['p95']:10.2f} ms")
+    print(f"results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
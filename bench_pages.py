@@ -0,0 +1,154 @@
+"""
+Headless page-latency regression harness
+
+Reruns app.main() for each page (menu item of app.menu_dict,
+Faculty with a row selected and each child tab) without browser
+and reports p50/p95 rerun latency per page.
+
+Streamlit 1.17 has no script-runner testing API (streamlit.testing),
+so the app runs in "bare" mode where widgets return their defaults.
+To drive pages, the harness keeps its own session state and
+(like a real session) returns session_state[key] for keyed widgets;
+the first grid of a page can return its first row as selected.
+
+Compared with --baseline (JSON written by --update-baseline),
+exit code is 1 if p50 of any page exceeds baseline p50 * --tolerance.
+
+Usage:
+    python gen_data.py --file-db bench.duckdb --rows 100000
+    python bench_pages.py --file-db bench.duckdb --update-baseline
+    python bench_pages.py --file-db bench.duckdb [--runs 20] [--cold]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import app_config
+from bench_db import stats
+
+BASELINE_FILE = "bench_pages_baseline.json"
+# keyed widgets which take their value from session state
+WIDGETS = ["selectbox", "radio", "checkbox", "text_input", "text_area", "number_input"]
+
+def page_specs(app):
+    """page name -> session state before rerun ("_select_row": select first grid row)
+    """
+    faculty = {"menu_item": app._STR_MENU_FACULTY, "selected_org": app.STR_CORNELL_UNIV}
+    specs = {menu_item: {"menu_item": menu_item} for menu_item in app.menu_dict.keys()}
+    specs[app._STR_MENU_FACULTY] = dict(faculty)
+    for tab in [app.STR_WORK, app.STR_TEAM, app.STR_NOTE, app.STR_TASK]:
+        specs[f"{app._STR_MENU_FACULTY} > {tab}"] = dict(faculty,
+                    faculty_menu_item=tab, _select_row=True)
+    specs[app._STR_MENU_PERSON].update({"selected_org": app.STR_ALL_ORGS})
+    specs[app._STR_MENU_RELATION].update({"selected_rel_type": "person-work"})
+    return specs
+
+class Session(object):
+    """emulate one browser session: session state and widget values
+    """
+    def __init__(self, st, app):
+        self.st = st
+        self.app = app
+        self.state = {}
+        self.select_row = False
+        self._grids = 0
+
+    def install(self):
+        st, app = self.st, self.app
+        st.session_state = self.state
+        for name in WIDGETS:
+            setattr(st, name, self._keyed_widget(getattr(st, name)))
+        layout_grid = app._layout_grid
+        def _layout_grid(df, **kwargs):
+            grid_resp = layout_grid(df, **kwargs)
+            self._grids += 1
+            if self.select_row and self._grids == 1 and len(df):
+                return {"selected_rows": [df.iloc[0].to_dict()], "data": df}
+            return grid_resp
+        app._layout_grid = _layout_grid
+
+    def _keyed_widget(self, widget):
+        state = self.state
+        def _widget(*args, key=None, **kwargs):
+            if key is not None and key in state:
+                return state[key]
+            value = widget(*args, key=key, **kwargs)
+            if key is not None:
+                state[key] = value
+            return value
+        return _widget
+
+    def rerun(self, spec):
+        self.state.clear()
+        self.state.update({k: v for k, v in spec.items() if not k.startswith("_")})
+        self.select_row = spec.get("_select_row", False)
+        self._grids = 0
+        t = time.perf_counter()
+        self.app.main()
+        return (time.perf_counter() - t) * 1000
+
+def run_pages(runs=20, cold=False):
+    import streamlit as st
+    import app
+    from app_helper import QUERY_CACHE
+
+    session = Session(st, app)
+    session.install()
+    results = {}
+    for page, spec in page_specs(app).items():
+        timings = []
+        for i in range(runs):
+            if cold:
+                QUERY_CACHE.clear()
+            timings.append(session.rerun(spec))
+        results[page] = stats(timings)
+    return results
+
+def compare(results, baseline, tolerance):
+    """return list of (page, p50, baseline p50) slower than tolerated
+    """
+    slow = []
+    for page, s in results.items():
+        base = baseline.get("pages", {}).get(page)
+        if base and s["p50"] > base["p50"] * tolerance:
+            slow.append((page, s["p50"], base["p50"]))
+    return slow
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless page-latency harness")
+    parser.add_argument("--file-db", required=True, help="database generated by gen_data.py")
+    parser.add_argument("--runs", type=int, default=20, help="reruns per page")
+    parser.add_argument("--cold", action="store_true", help="clear query cache before each rerun")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+
+    # must be set before app/app_helper are imported (default arguments)
+    app_config.FILE_DB = args.file_db
+    results = run_pages(runs=args.runs, cold=args.cold)
+    for page, s in results.items():
+        print(f"{page:24s} p50 {s['p50']:9.1f} ms   p95 {s['p95']:9.1f} ms")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"run_at": str(datetime.now()), "file_db": args.file_db,
+                       "runs": args.runs, "cold": args.cold, "pages": results}, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).exists():
+        print(f"[WARN] no baseline {args.baseline}, run with --update-baseline")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    slow = compare(results, baseline, args.tolerance)
+    for page, p50, base in slow:
+        print(f"[ERROR] {page}: p50 {p50:.1f} ms > {args.tolerance} x baseline {base:.1f} ms")
+    return 1 if slow else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
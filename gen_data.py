@@ -0,0 +1,161 @@
+"""
+Generate synthetic CS Faculty database for benchmarks
+
+Tables are created from COLUMN_PROPS (all columns VARCHAR) and filled by DuckDB
+from range(), so that 10M rows take seconds rather than hours:
+    g_org       orgs, "Cornell Univ" first
+    g_person    persons, org skewed (few large universities, long tail)
+    g_work      works, linked to persons by g_relation (person-work)
+    g_entity    research groups and awards, linked by g_relation (person-team, person-award)
+    g_note      notes, child of g_person by ref_tab/ref_key/ref_val
+    g_task      tasks, child of g_person by ref_tab/ref_key/ref_val
+    g_relation  person-work (~1.5 per work), person-team, person-award
+
+Usage:
+    python gen_data.py --file-db bench.duckdb --rows 100000 [--seed 0.42]
+"""
+import argparse
+import time
+from pathlib import Path
+
+from app_config import COLUMN_PROPS, PERSON_TYPES, WORK_TYPES, NOTE_TYPES, \
+        TASK_STATUS, PRIORITY
+
+# default org of Faculty menu (app.STR_CORNELL_UNIV), must exist
+STR_CORNELL_UNIV = "Cornell Univ"
+
+# share of total rows per table
+ROW_MIX = {
+    "g_person": 0.12,
+    "g_work": 0.24,
+    "g_entity": 0.01,
+    "g_note": 0.12,
+    "g_task": 0.06,
+    "g_relation": 0.45,
+}
+NUM_ORGS = 200
+# skew of org/person picks: index = floor(n * random() ^ SKEW)
+SKEW = 2.5
+
+def _pick(values):
+    """SQL expression picking one of (non-blank) values at random"""
+    values = [v for v in values if v]
+    sql_list = ", ".join([f"'{v}'" for v in values])
+    return f"list_extract(list_value({sql_list}), 1 + floor(random() * {len(values)})::int)"
+
+def _skewed(n):
+    """SQL expression of skewed index in [0, n)"""
+    return f"least({n} - 1, floor({n} * pow(random(), {SKEW})))::bigint"
+
+def create_tables(conn):
+    for table_name, col_props in COLUMN_PROPS.items():
+        cols = ", ".join([f"{c} varchar" for c in col_props.keys()])
+        conn.execute(f"create table if not exists {table_name} ({cols});")
+
+def gen_data(file_db, rows=100_000, seed=0.42):
+    """generate about rows records in file_db (must not exist),
+    return dict of row count per table
+    """
+    import duckdb
+    if Path(file_db).exists():
+        raise Exception(f"Database file exists: {file_db}")
+    n = {t: max(10, int(rows * r)) for t, r in ROW_MIX.items()}
+    n_person, n_work, n_entity = n["g_person"], n["g_work"], n["g_entity"]
+    ts = "2023-06-04 00:00:00"
+
+    conn = duckdb.connect(file_db)
+    conn.execute(f"select setseed({seed});")
+    create_tables(conn)
+
+    conn.execute(f"""
+        insert into g_org (id, name, url, org_type, ts, uid)
+        select 'o' || i,
+            case when i = 0 then '{STR_CORNELL_UNIV}' else 'Univ ' || i end,
+            'https://org' || i || '.edu', 'university', '{ts}', 'gen'
+        from range({NUM_ORGS}) t(i);
+    """)
+    conn.execute(f"""
+        insert into g_person (id, name, url, org, person_type, job_title,
+            research_area, department, email, phd_univ, phd_year, note, ts, uid)
+        select 'p' || i, 'Person ' || i, 'https://people.example.edu/~p' || i,
+            case when i = 0 then '{STR_CORNELL_UNIV}' else o.name end,
+            case when random() < 0.6 then 'faculty' else {_pick(PERSON_TYPES)} end,
+            'Professor', 'Area ' || (i % 37), 'Computer Science',
+            'p' || i || '@example.edu', 'Univ ' || (i % 53), (1970 + i % 50)::varchar,
+            case when random() < 0.3 then 'note on person ' || i end,
+            '{ts}', 'gen'
+        from (select i, {_skewed(NUM_ORGS)} as org_ix from range({n_person}) t(i)) p
+        join g_org o on o.id = 'o' || p.org_ix;
+    """)
+    conn.execute(f"""
+        insert into g_work (id, name, url, work_type, authors, summary, ts, uid)
+        select 'w' || i, 'Work ' || i, 'https://papers.example.org/w' || i,
+            {_pick(WORK_TYPES)}, 'Person ' || (i % {n_person}),
+            case when random() < 0.5 then 'summary of work ' || i end,
+            '{ts}', 'gen'
+        from range({n_work}) t(i);
+    """)
+    conn.execute(f"""
+        insert into g_entity (id, name, url, entity_type, ts, uid)
+        select 'e' || i,
+            case when i % 2 = 0 then 'Research Group ' || i else 'Award ' || i end,
+            'https://entity.example.org/e' || i,
+            case when i % 2 = 0 then 'research_group' else 'award' end,
+            '{ts}', 'gen'
+        from range({n_entity}) t(i);
+    """)
+    for table_name, extra_cols, extra_vals in [
+            ("g_note", "note_type, note", f"{_pick(NOTE_TYPES)}, 'note text ' || i"),
+            ("g_task", "task_status, priority, due_date",
+                f"{_pick(TASK_STATUS)}, {_pick(PRIORITY)}, '2023-07-' || lpad((1 + i % 28)::varchar, 2, '0')"),
+        ]:
+        prefix = table_name[2]
+        conn.execute(f"""
+            insert into {table_name} (id, name, url, {extra_cols}, ref_tab, ref_key, ref_val, ts, uid)
+            select '{prefix}' || i, '{table_name[2:].title()} ' || i,
+                'https://{table_name[2:]}.example.org/{prefix}' || i, {extra_vals},
+                'g_person', 'url', 'https://people.example.edu/~p' || {_skewed(n_person)},
+                '{ts}', 'gen'
+            from range({n[table_name]}) t(i);
+        """)
+
+    # relations: person-work ~ 75%, person-team ~ 20%, person-award ~ 5%
+    n_rel = n["g_relation"]
+    n_pw, n_pt = int(n_rel * 0.75), int(n_rel * 0.20)
+    n_pa = n_rel - n_pw - n_pt
+    for rel_type, ref_tab_sub, n_sub, sub_prefix, cnt, offset in [
+            ("person-work", "g_work", n_work, "w", n_pw, 0),
+            ("person-team", "g_entity", n_entity // 2, "e", n_pt, n_pw),
+            ("person-award", "g_entity", n_entity // 2, "e", n_pa, n_pw + n_pt),
+        ]:
+        # entities alternate research_group (even id) / award (odd id)
+        sub_id = f"(floor(random() * {n_sub})::bigint * 2 + {1 if rel_type == 'person-award' else 0})" \
+                    if ref_tab_sub == "g_entity" else f"(i % {n_sub})"
+        conn.execute(f"""
+            insert into g_relation (id, rel_type, ref_tab, ref_key, ref_val,
+                ref_tab_sub, ref_key_sub, ref_val_sub, ts, uid)
+            select 'r' || ({offset} + i), '{rel_type}',
+                'g_person', 'url', 'https://people.example.edu/~p' || {_skewed(n_person)},
+                '{ref_tab_sub}', 'id', '{sub_prefix}' || {sub_id},
+                '{ts}', 'gen'
+            from range({cnt}) t(i);
+        """)
+
+    counts = {t: conn.execute(f"select count(*) from {t}").fetchone()[0] for t in COLUMN_PROPS}
+    conn.execute("checkpoint;")
+    conn.close()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic CS Faculty database")
+    parser.add_argument("--file-db", required=True)
+    parser.add_argument("--rows", type=int, default=100_000, help="approx. total rows (10k - 10M)")
+    parser.add_argument("--seed", type=float, default=0.42)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    counts = gen_data(args.file_db, rows=args.rows, seed=args.seed)
+    print(f"generated {sum(counts.values())} rows in {time.perf_counter() - t:.1f} sec: {counts}")
+
+if __name__ == "__main__":
+    main()
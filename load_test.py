@@ -0,0 +1,282 @@
+"""
+Concurrent-session load test for a running Streamlit server (localhost only)
+
+Opens N simulated browser sessions on the Streamlit websocket,
+each session repeats a scripted workflow:
+    open app -> Faculty -> pick org -> select first faculty (best effort)
+    -> Note (All) -> save note by Quick Add
+Every step sends a rerun with widget states, as the browser does,
+and is timed until the server reports "script finished".
+
+Reports throughput, latency percentiles per step, errors shown by the app
+(lock errors counted separately) and server RSS over time, as JSON.
+
+Grid row selection is sent as AgGrid component value,
+its format depends on st_aggrid version, so the step is best effort.
+
+Usage:
+    streamlit run app.py --server.headless true &
+    python load_test.py [--port 8501] [--sessions 10] [--duration 60] [--out load_test.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+from bench_db import stats
+
+LOCK_ERRORS = ("lock", "conflict", "transactionexception")
+
+def find_server_pid():
+    """pid of 'streamlit run' process, from /proc (Linux)
+    """
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            cmdline = open(f"/proc/{pid}/cmdline", "rb").read().split(b"\0")
+        except OSError:
+            continue
+        if b"streamlit" in b" ".join(cmdline) and b"run" in cmdline:
+            return int(pid)
+    return None
+
+def read_rss_mb(pid):
+    try:
+        for line in open(f"/proc/{pid}/status"):
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+class LoadSession(object):
+    """one simulated browser session on the Streamlit websocket
+    """
+    def __init__(self, ws, name):
+        self.ws = ws
+        self.name = name
+        self.widgets = {}       # label -> (element type, proto)
+        self.states = {}        # widget id -> WidgetState
+        self.components = []    # ComponentInstance protos of last run
+        self.errors = []
+        self._cache = {}        # ForwardMsg hash -> msg
+
+    @classmethod
+    async def connect(cls, host, port, name):
+        from tornado.websocket import websocket_connect
+        last_ex = None
+        for path in ["_stcore/stream", "stream"]:
+            try:
+                ws = await websocket_connect(f"ws://{host}:{port}/{path}")
+                return cls(ws, name)
+            except Exception as ex:
+                last_ex = ex
+        raise last_ex
+
+    async def rerun(self):
+        """send rerun with current widget states, wait for script end,
+        return (ms, errors of this run)
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        back_msg = BackMsg()
+        back_msg.rerun_script.query_string = ""
+        back_msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        # button clicks are sent once
+        for wid, ws in list(self.states.items()):
+            if ws.HasField("trigger_value"):
+                del self.states[wid]
+        self.components = []
+        errors = []
+
+        t = time.perf_counter()
+        await self.ws.write_message(back_msg.SerializeToString(), binary=True)
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                raise Exception(f"[{self.name}] websocket closed")
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            if msg.WhichOneof("type") == "ref_hash":
+                msg = self._cache.get(msg.ref_hash, msg)
+            elif msg.hash:
+                self._cache[msg.hash] = msg
+            msg_type = msg.WhichOneof("type")
+            if msg_type == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                self._on_element(msg.delta.new_element, errors)
+            elif msg_type == "script_finished":
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        ms = (time.perf_counter() - t) * 1000
+        self.errors.extend(errors)
+        return ms, errors
+
+    def _on_element(self, element, errors):
+        el_type = element.WhichOneof("type")
+        if el_type == "exception":
+            errors.append(f"{element.exception.type}: {element.exception.message}")
+        elif el_type == "alert" and element.alert.format == element.alert.ERROR:
+            errors.append(element.alert.body)
+        elif el_type == "component_instance":
+            self.components.append(element.component_instance)
+        else:
+            proto = getattr(element, el_type)
+            if hasattr(proto, "id") and hasattr(proto, "label"):
+                self.widgets[proto.label] = (el_type, proto)
+
+    def _state(self, label):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        if label not in self.widgets:
+            raise Exception(f"[{self.name}] widget not found: {label}")
+        el_type, proto = self.widgets[label]
+        ws = WidgetState(id=proto.id)
+        self.states[proto.id] = ws
+        return ws, proto
+
+    def select(self, label, option=None):
+        """set selectbox to option (random one if None), return option
+        """
+        ws, proto = self._state(label)
+        options = list(proto.options)
+        option = random.choice(options) if option is None else option
+        ws.int_value = options.index(option)
+        return option
+
+    def text(self, label, value):
+        ws, _ = self._state(label)
+        ws.string_value = value
+
+    def click(self, label):
+        ws, _ = self._state(label)
+        ws.trigger_value = True
+
+    def select_grid_row(self):
+        """select first row of first AgGrid (best effort), return True if sent
+        """
+        if not self.components:
+            return False
+        comp = self.components[0]
+        try:
+            args = json.loads(comp.json_args)
+            rows = args.get("gridOptions", {}).get("rowData") or json.loads(args.get("row_data", "[]"))
+            for arg in comp.special_args:
+                # st_aggrid >= 1.0 sends data as Arrow table
+                if not rows and arg.WhichOneof("value") == "arrow_dataframe":
+                    import pyarrow as pa
+                    table = pa.ipc.open_stream(arg.arrow_dataframe.data.data).read_all()
+                    rows = table.to_pylist()
+        except Exception:
+            return False
+        if not rows:
+            return False
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        value = {"selectedRows": rows[:1], "rowData": rows,
+                 "nodes": [{"id": "0", "rowIndex": 0, "isSelected": True, "data": rows[0]}]}
+        self.states[comp.id] = WidgetState(id=comp.id, json_value=json.dumps(value))
+        return True
+
+async def workflow(session, labels, step_ms, counters, deadline, iteration=0):
+    """run scripted workflow until deadline
+    """
+    async def step(name):
+        ms, errors = await session.rerun()
+        step_ms.setdefault(name, []).append(ms)
+        counters["reruns"] += 1
+        for e in errors:
+            counters["errors"] += 1
+            if any(k in e.lower() for k in LOCK_ERRORS):
+                counters["lock_errors"] += 1
+
+    await step("open")
+    while time.time() < deadline:
+        iteration += 1
+        try:
+            session.select("Menu:", labels["faculty"])
+            await step("menu_faculty")
+            session.select("Select Org:")
+            await step("pick_org")
+            if session.select_grid_row():
+                await step("select_faculty")
+            session.select("Menu:", labels["note"])
+            await step("menu_note")
+            session.text("Name", f"load test note {session.name}-{iteration}")
+            session.text("URL", f"https://load.test/{session.name}/{iteration}")
+            session.click(labels["add"])
+            await step("save_note")
+            counters["workflows"] += 1
+        except Exception as ex:
+            # e.g. widget missing after script error: start over like a page reload
+            counters["workflow_errors"] += 1
+            session.errors.append(str(ex))
+            session.states.clear()
+            await step("open")
+
+async def sample_rss(pid, rss, deadline, interval=1.0):
+    t0 = time.time()
+    while time.time() < deadline:
+        mb = read_rss_mb(pid)
+        if mb is not None:
+            rss.append((round(time.time() - t0, 1), round(mb, 1)))
+        await asyncio.sleep(interval)
+
+async def run_load(host, port, num_sessions, duration, server_pid, labels):
+    step_ms, rss = {}, []
+    counters = {"reruns": 0, "workflows": 0, "workflow_errors": 0, "errors": 0, "lock_errors": 0}
+    sessions = [await LoadSession.connect(host, port, f"s{i}") for i in range(num_sessions)]
+    t = time.time()
+    deadline = t + duration
+    tasks = [workflow(s, labels, step_ms, counters, deadline) for s in sessions]
+    if server_pid:
+        tasks.append(sample_rss(server_pid, rss, deadline))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.time() - t
+    for s in sessions:
+        s.ws.close()
+    return {
+        "run_at": str(datetime.now()),
+        "sessions": num_sessions,
+        "duration_sec": round(elapsed, 1),
+        "server_pid": server_pid,
+        "throughput_reruns_per_sec": round(counters["reruns"] / elapsed, 2),
+        "throughput_workflows_per_min": round(counters["workflows"] * 60 / elapsed, 2),
+        "counters": counters,
+        "steps": {name: stats(ms) for name, ms in step_ms.items()},
+        "session_failures": [str(r) for r in results if isinstance(r, Exception)],
+        "sample_errors": sorted(set([e for s in sessions for e in s.errors]))[:20],
+        "rss_mb": rss,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test (localhost)")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--server-pid", type=int, default=0, help="default: find 'streamlit run'")
+    parser.add_argument("--out", default="load_test.json")
+    args = parser.parse_args()
+
+    # i18n labels of widgets driven by workflow
+    import app
+    labels = {"faculty": app._STR_MENU_FACULTY, "note": app._STR_MENU_NOTE, "add": app.STR_ADD}
+    server_pid = args.server_pid or find_server_pid()
+    results = asyncio.run(run_load("127.0.0.1", args.port, args.sessions, args.duration,
+                                    server_pid, labels))
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{results['sessions']} sessions, {results['throughput_reruns_per_sec']} reruns/sec, "
+          f"{results['throughput_workflows_per_min']} workflows/min, "
+          f"errors {results['counters']['errors']} (lock {results['counters']['lock_errors']})")
+    for name, s in results["steps"].items():
+        print(f"{name:16s} p50 {s['p50']:9.1f} ms   p95 {s['p95']:9.1f} ms")
+    if results["rss_mb"]:
+        print(f"server RSS: {results['rss_mb'][0][1]} -> {results['rss_mb'][-1][1]} MB")
+    print(f"results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
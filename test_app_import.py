@@ -0,0 +1,60 @@
+"""
+Tests of app_import, run by: python -m pytest -q
+"""
+import io
+
+import duckdb
+import pyarrow as pa
+
+from app_import import coerce_chunk, import_upload, sheet_target, validate_chunk
+
+# g_person columns of the production database, incl. columns not in COLUMN_PROPS
+PERSON_COLS = ["id", "ts", "uid", "person_type", "name", "job_title", "phd_univ", "phd_year",
+               "research_area", "research_concentration", "research_focus", "url", "img_url",
+               "phone", "email", "cell_phone", "office_address", "department", "org", "note"]
+
+def _faculty_chunk(rows):
+    names = list(rows[0].keys())
+    table = pa.table({c: pa.array([r[c] for r in rows], type=pa.string()) for c in names})
+    return coerce_chunk(table, sheet_target("faculty"), [c for c in PERSON_COLS if c not in ("ts", "uid")])
+
+def test_blank_optional_columns_pass():
+    chunk = _faculty_chunk([
+        {"name": "Alice", "url": "", "email": "", "phd_year": ""},
+        {"name": "Bob", "url": " ", "email": None, "phd_year": None},
+    ])
+    valid, rejected, reasons = validate_chunk(chunk, "g_person")
+    assert valid.num_rows == 2
+    assert reasons == []
+
+def test_invalid_values_rejected():
+    chunk = _faculty_chunk([
+        {"name": "Alice", "url": "https://a", "email": "a@b.edu", "phd_year": "1995"},
+        {"name": "Bob", "url": "b.edu", "email": "", "phd_year": ""},
+        {"name": "Carol", "url": "", "email": "nomail", "phd_year": "19x5"},
+        {"name": "Dave", "url": "", "email": "", "phd_year": "1800"},
+        {"name": "", "url": "", "email": "", "phd_year": "2001"},
+    ])
+    valid, rejected, reasons = validate_chunk(chunk, "g_person")
+    assert valid["name"].to_pylist() == ["Alice"]
+    assert rejected.to_pylist() == [False, True, True, True, True]
+    assert reasons == ["invalid url", "invalid email; invalid phd_year",
+                       "invalid phd_year", "missing name"]
+
+def test_faculty_round_trip(tmp_path):
+    file_db = str(tmp_path / "import.duckdb")
+    with duckdb.connect(file_db) as conn:
+        conn.execute(f"create table g_person ({', '.join([c + ' varchar' for c in PERSON_COLS])});")
+    upload = ("name,url,img_url,phone,research_concentration,research_focus,phd_year\n"
+              "Alice,https://a.edu,https://a.edu/a.jpg,555-0100,Systems,Databases,1995\n"
+              "Bob,https://b.edu,b.jpg,555-0101,,,\n")
+    report, rejects = import_upload(io.BytesIO(upload.encode()), "faculty.csv", file_db=file_db)
+    assert report["faculty"]["rows"] == 1
+    assert report["faculty"]["rejected"] == 1
+    assert b"invalid img_url" in rejects["faculty"]
+    with duckdb.connect(file_db) as conn:
+        row = conn.execute("""
+            select name, person_type, img_url, phone, research_concentration, research_focus, phd_year
+            from g_person;
+        """).fetchall()
+    assert row == [("Alice", "faculty", "https://a.edu/a.jpg", "555-0100", "Systems", "Databases", "1995")]